@@ -1,8 +1,26 @@
 import os
 from celery import Celery
+from celery.signals import task_postrun, task_prerun, worker_process_init
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'credit_system.settings')
 
 app = Celery('credit_system')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def reset_db_after_fork(**kwargs):
+    # Prefork children must open their own connections and pool.
+    from .db import discard_inherited_connections
+
+    discard_inherited_connections()
+
+
+@task_prerun.connect
+@task_postrun.connect
+def release_db_connections(**kwargs):
+    # Tasks check connections in and out like web requests do.
+    from .db import release_connections
+
+    release_connections()
@@ -0,0 +1,54 @@
+"""Database connection lifecycle for web and Celery processes.
+
+Web requests already return their connection to the pool (or close it once
+CONN_MAX_AGE passes) through Django's request_started/request_finished
+handlers. Celery tasks get the same treatment from the signal handlers wired
+up in credit_system/celery.py.
+"""
+from django.db import close_old_connections, connections
+
+# Connections and pools inherited from a parent process. They are kept
+# referenced so garbage collection never closes them: closing would send a
+# termination message over a socket the parent is still using.
+_inherited = []
+
+
+def discard_inherited_connections():
+    """Forget database connections and pools inherited across fork()."""
+    for conn in connections.all(initialized_only=True):
+        if conn.connection is not None:
+            _inherited.append(conn.connection)
+            conn.connection = None
+        pools = getattr(conn, '_connection_pools', None)
+        if pools and conn.alias in pools:
+            _inherited.append(pools.pop(conn.alias))
+
+
+def release_connections(**kwargs):
+    """Return connections to the pool, or close unusable/expired ones."""
+    close_old_connections()
+
+
+def pool_stats():
+    """Pool size, saturation and wait-time metrics per database alias.
+
+    Aliases without a pool report ``{"pooled": False}``.
+    """
+    stats = {}
+    for conn in connections.all():
+        pool = getattr(conn, 'pool', None)
+        if pool is None:
+            stats[conn.alias] = {'pooled': False}
+            continue
+        raw = pool.get_stats()
+        size = raw.get('pool_size', 0)
+        in_use = size - raw.get('pool_available', 0)
+        requests = raw.get('requests_num', 0)
+        stats[conn.alias] = {
+            'pooled': True,
+            **raw,
+            'in_use': in_use,
+            'saturation': in_use / raw['pool_max'] if raw.get('pool_max') else 0.0,
+            'avg_wait_ms': raw.get('requests_wait_ms', 0) / requests if requests else 0.0,
+        }
+    return stats
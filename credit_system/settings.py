@@ -77,18 +77,86 @@ WSGI_APPLICATION = 'credit_system.wsgi.application'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
 import os
+import sys
+
+# `manage.py test` runs against SQLite unless DATABASE_ENGINE=postgresql is
+# set explicitly, e.g. to test against a local Postgres.
+TESTING = sys.argv[1:2] == ["test"]
+DATABASE_ENGINE = os.environ.get("DATABASE_ENGINE", "sqlite" if TESTING else "postgresql")
+
+if DATABASE_ENGINE == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("POSTGRES_DB", "credit_system"),
+            "USER": os.environ.get("POSTGRES_USER", "credit_user"),
+            "PASSWORD": os.environ.get("POSTGRES_PASSWORD", "credit_pass"),
+            "HOST": os.environ.get("POSTGRES_HOST", "db"),
+            "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+            # Validate connections before reuse (and on pool checkout)
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {},
+        }
+    }
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.postgresql",
-        "NAME": os.environ.get("POSTGRES_DB", "credit_system"),
-        "USER": os.environ.get("POSTGRES_USER", "credit_user"),
-        "PASSWORD": os.environ.get("POSTGRES_PASSWORD", "credit_pass"),
-        "HOST": os.environ.get("POSTGRES_HOST", "db"),
-        "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+    # Connection pooling (psycopg 3 pool), one pool per process. Web requests
+    # and Celery tasks check a connection out and return it when they finish
+    # (see credit_system/db.py). With DB_POOL=false (the default), connections
+    # persist for DB_CONN_MAX_AGE seconds instead; 0 opens one per request.
+    if os.environ.get("DB_POOL", "false").lower() in ("1", "true", "yes"):
+        DATABASES["default"]["OPTIONS"]["pool"] = {
+            "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+            "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+            "timeout": float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+            "max_idle": float(os.environ.get("DB_POOL_MAX_IDLE", 600)),
+            "max_lifetime": float(os.environ.get("DB_POOL_MAX_LIFETIME", 3600)),
+        }
+    else:
+        DATABASES["default"]["CONN_MAX_AGE"] = int(os.environ.get("DB_CONN_MAX_AGE", 0))
+
+
+# Cache
+# Shared across processes when CACHE_URL points at Redis; admission-control
+# counters live here, so a per-process locmem cache only suits tests and dev.
+
+CACHE_URL = os.environ.get("CACHE_URL")
+
+if CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
     }
+
+# Reverse proxies in front of the app. DRF only trusts that many X-Forwarded-For
+# entries when identifying a client for throttling; 0 keys on REMOTE_ADDR.
+REST_FRAMEWORK = {
+    "NUM_PROXIES": int(os.environ.get("NUM_PROXIES", 0)),
 }
 
+# Admission control for check-eligibility/ and create-loan/ (loans/throttling.py)
+
+ADMISSION_CONTROL = {
+    "CLIENT_RATE": float(os.environ.get("ADMISSION_CLIENT_RATE", 10)),
+    "CLIENT_BURST": int(os.environ.get("ADMISSION_CLIENT_BURST", 20)),
+    "GLOBAL_RATE": float(os.environ.get("ADMISSION_GLOBAL_RATE", 200)),
+    "GLOBAL_BURST": int(os.environ.get("ADMISSION_GLOBAL_BURST", 400)),
+    "MAX_IN_FLIGHT": int(os.environ.get("ADMISSION_MAX_IN_FLIGHT", 32)),
+}
 
 
 # Password validation
@@ -136,3 +204,21 @@ CELERY_RESULT_BACKEND = 'redis://redis:6379/0'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
+# Celery's Django fixup otherwise closes connections (and the pool) around every
+# task; credit_system/db.py returns the connection to the pool instead.
+CELERY_DB_REUSE_MAX = int(os.environ.get('CELERY_DB_REUSE_MAX', 1000))
+CELERY_BEAT_SCHEDULE = {
+    'archive-closed-loans': {
+        'task': 'loans.tasks.archive_closed_loans',
+        'schedule': 24 * 60 * 60,
+        'kwargs': {'batch_size': 1000},
+    },
+    'relay-outbox-events': {
+        'task': 'loans.tasks.relay_outbox_events',
+        'schedule': 5.0,
+    },
+    'purge-outbox-events': {
+        'task': 'loans.tasks.purge_outbox_events',
+        'schedule': 60 * 60,
+    },
+}
@@ -1,13 +1,118 @@
+import json
+
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils.functional import cached_property
+from . import outbox, rollups
 from .models import Customer, Loan
 
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that trusts the planner's row estimate on big tables.
+
+    An exact ``COUNT(*)`` scans every matching row on PostgreSQL. For an
+    unfiltered changelist we read ``pg_class.reltuples``; for a filtered one
+    (``?status__exact=APPROVED``, a search) the row estimate from ``EXPLAIN``.
+    Only when the estimate is small (or on other backends) do we count
+    exactly.
+    """
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if connections[queryset.db].vendor == 'postgresql':
+            estimate = self.estimated_count(queryset)
+            if estimate > self.exact_count_threshold:
+                return estimate
+        return super().count
+
+    @staticmethod
+    def estimated_count(queryset):
+        if queryset.query.where:
+            plan = json.loads(queryset.order_by().explain(format='json'))
+            return plan[0]['Plan']['Plan Rows']
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else -1
+
+
+class ScaleAwareAdmin(admin.ModelAdmin):
+    """Admin defaults for tables too large for exact counts and ``icontains``.
+
+    ``search_fields`` should use ``^`` (prefix) lookups, which PostgreSQL
+    serves from the trigram indexes added in migration 0003. Other backends
+    have no such index, so searches there fall back to exact matches on
+    ``exact_search_fields``, which are covered by ordinary B-tree indexes.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    exact_search_fields = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' or not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+
+        condition = Q()
+        for field in self.exact_search_fields:
+            condition |= Q(**{field: search_term.strip()})
+        return queryset.filter(condition), False
+
+
 @admin.register(Customer)
-class CustomerAdmin(admin.ModelAdmin):
+class CustomerAdmin(ScaleAwareAdmin):
     list_display = ('id', 'first_name', 'last_name', 'email', 'phone', 'created_at')
-    search_fields = ('first_name', 'last_name', 'email', 'phone')
+    search_fields = ('^first_name', '^last_name', '^email', '^phone')
+    exact_search_fields = ('first_name', 'last_name', 'email', 'phone')
+
+    # Admin writes record the same outbox events as the API (see views.py),
+    # so the score cache and rollups follow edits made here.
+    @transaction.atomic
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        outbox.record_customer_event('customer.updated' if change else 'customer.created', obj)
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, Customer.objects.filter(pk=obj.pk))
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        customer_ids = list(queryset.values_list('pk', flat=True))
+        customers = Customer.objects.filter(pk__in=customer_ids)
+        list(customers.select_for_update().values_list('pk', flat=True))
+        outbox.record_customers_event('customer.deleted', customer_ids)
+        rollups.record_rollup_delta(rollups.customer_removal_delta(customer_ids))
+        customers.delete()
 
 @admin.register(Loan)
-class LoanAdmin(admin.ModelAdmin):
+class LoanAdmin(ScaleAwareAdmin):
     list_display = ('id', 'customer', 'amount', 'term_months', 'status', 'created_at')
-    list_filter = ('status',)
-    search_fields = ('customer__first_name', 'customer__last_name', 'customer__email')
+    list_select_related = ('customer',)
+    list_filter = ('status',)  # fixed choices, so the filter sidebar never queries
+    search_fields = ('^customer__first_name', '^customer__last_name', '^customer__email')
+    exact_search_fields = ('customer__first_name', 'customer__last_name', 'customer__email')
+
+    @transaction.atomic
+    def save_model(self, request, obj, form, change):
+        previous = None
+        if change:
+            # The form has already changed obj; snapshot the row as stored.
+            previous = outbox.loan_snapshot(Loan.objects.select_for_update().get(pk=obj.pk))
+        super().save_model(request, obj, form, change)
+        outbox.record_loan_event('loan.updated' if change else 'loan.created', obj, previous=previous)
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, Loan.objects.filter(pk=obj.pk))
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        loans = Loan.objects.filter(pk__in=list(queryset.values_list('pk', flat=True)))
+        outbox.record_loan_events('loan.deleted', loans.select_for_update())
+        loans.delete()
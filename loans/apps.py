@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class LoansConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'loans'
+
+    def ready(self):
+        # Registers the rollup outbox handlers
+        from . import rollups  # noqa: F401
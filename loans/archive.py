@@ -0,0 +1,55 @@
+"""Hot/cold split of the Loan table.
+
+Loans whose tenure (``created_at`` + ``term_months``) has ended are moved in
+batches from ``Loan`` to the compact ``ArchivedLoan`` table, so the hot table
+only holds loans that can still change. Scoring adds the archived loans back
+in through a single aggregate (see ``utils.calculate_credit_score``).
+"""
+import calendar
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ArchivedLoan, Loan
+
+
+def add_months(value, months):
+    """Shift a date/datetime by whole months, clamping the day to the month's end."""
+    month_index = value.month - 1 + months
+    year = value.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+
+def closed_loans(now=None):
+    """Loans whose tenure ended on or before ``now``.
+
+    Month arithmetic is not portable SQL, so the cutoff is computed per
+    distinct ``term_months`` value (a small set) and OR-ed together.
+    """
+    now = now or timezone.now()
+    terms = Loan.objects.values_list('term_months', flat=True).distinct()
+    condition = Q(pk__in=[])
+    for term in terms:
+        condition |= Q(term_months=term, created_at__lte=add_months(now, -term))
+    return Loan.objects.filter(condition)
+
+
+def archive_closed_loans(batch_size=1000, now=None):
+    """Move closed loans to ArchivedLoan, one transaction per batch.
+
+    Returns the number of loans archived.
+    """
+    candidates = closed_loans(now).order_by('pk')
+    archived = 0
+    while True:
+        with transaction.atomic():
+            batch = list(candidates.select_for_update()[:batch_size])
+            if not batch:
+                break
+            ArchivedLoan.objects.bulk_create([ArchivedLoan.from_loan(loan) for loan in batch])
+            Loan.objects.filter(pk__in=[loan.pk for loan in batch]).delete()
+        archived += len(batch)
+    return archived
@@ -0,0 +1,54 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from rest_framework.decorators import api_view, throttle_classes
+from rest_framework.response import Response
+
+from loans.throttling import SCORING_THROTTLES, limit_concurrency, slot_keys
+
+
+@api_view(['POST'])
+def bare_view(request):
+    return Response({})
+
+
+@api_view(['POST'])
+@throttle_classes(SCORING_THROTTLES)
+@limit_concurrency
+def guarded_view(request):
+    return Response({})
+
+
+class Command(BaseCommand):
+    help = 'Measure the per-request overhead of the admission-control throttles against the configured cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        n = options['requests']
+        factory = RequestFactory()
+        # Rates high enough that nothing is rejected; only the bookkeeping is timed.
+        unlimited = {
+            'CLIENT_RATE': 1e9, 'CLIENT_BURST': 1e9,
+            'GLOBAL_RATE': 1e9, 'GLOBAL_BURST': 1e9,
+        }
+
+        with override_settings(ADMISSION_CONTROL=unlimited):
+            cache.delete_many(['throttle:scoring:global', 'throttle:scoring:client:127.0.0.1', *slot_keys('scoring')])
+            results = {}
+            for name, view in (('bare', bare_view), ('admission control', guarded_view)):
+                start = time.perf_counter()
+                for _ in range(n):
+                    view(factory.post('/'))
+                results[name] = (time.perf_counter() - start) / n * 1e6
+
+        backend = settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1]
+        for name, per_request in results.items():
+            self.stdout.write(f"{name}: {per_request:.1f} us/request")
+        self.stdout.write(self.style.SUCCESS(
+            f"overhead ({backend}): {results['admission control'] - results['bare']:.1f} us/request"
+        ))
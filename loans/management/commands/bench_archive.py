@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from loans.archive import archive_closed_loans
+from loans.models import Customer, Loan
+from loans.utils import calculate_credit_score
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare hot Loan table query latency before and after archiving closed loans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=200, help='Customers sampled for per-customer queries')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--commit', action='store_true', help='Keep the archived rows instead of rolling back')
+
+    def handle(self, *args, **options):
+        customer_ids = list(Customer.objects.order_by('id').values_list('id', flat=True)[:options['customers']])
+        if not customer_ids:
+            self.stdout.write(self.style.WARNING('No customers to benchmark; generate or import data first.'))
+            return
+
+        try:
+            with transaction.atomic():
+                before = self._measure(customer_ids)
+                start = time.perf_counter()
+                archived = archive_closed_loans(batch_size=options['batch_size'])
+                archive_time = time.perf_counter() - start
+                after = self._measure(customer_ids)
+                if not options['commit']:
+                    raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(f"archived {archived} loans in {archive_time:.2f} s")
+        self.stdout.write(f"hot rows: {before.pop('hot rows')} -> {after.pop('hot rows')}")
+        for name in before:
+            self.stdout.write(f"{name}: {before[name]:.2f} ms -> {after[name]:.2f} ms")
+        if not options['commit']:
+            self.stdout.write(self.style.WARNING('Rolled back; pass --commit to keep the archive.'))
+
+    def _measure(self, customer_ids):
+        results = {'hot rows': Loan.objects.count()}
+
+        start = time.perf_counter()
+        for customer_id in customer_ids:
+            list(Loan.objects.filter(customer_id=customer_id))
+        results['loans by customer (per customer)'] = (time.perf_counter() - start) / len(customer_ids) * 1000
+
+        customers = list(Customer.objects.filter(id__in=customer_ids))
+        start = time.perf_counter()
+        for customer in customers:
+            calculate_credit_score(customer)
+        results['credit score (per customer)'] = (time.perf_counter() - start) / len(customers) * 1000
+
+        start = time.perf_counter()
+        Loan.objects.filter(status='APPROVED').aggregate(Sum('amount'))
+        results['approved exposure scan'] = (time.perf_counter() - start) * 1000
+
+        return results
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+
+
+class Rollback(Exception):
+    pass
+
+
+def make_rows(count, offset):
+    return [
+        {
+            'first_name': 'Bench', 'last_name': f'Customer{i}', 'phone': f'7{offset + i:09d}',
+            'monthly_income': 50000 + i, 'age': 30,
+        }
+        for i in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Compare N sequential register/ calls with one register/bulk/ call (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = options['customers']
+        client = Client()
+        results = {}
+
+        for name in ('sequential', 'bulk'):
+            # Distinct phone ranges so the runs cannot collide with each other.
+            rows = make_rows(count, offset=len(results) * count)
+            try:
+                with transaction.atomic():
+                    start = time.perf_counter()
+                    if name == 'sequential':
+                        for row in rows:
+                            client.post('/api/register/', row, content_type='application/json')
+                    else:
+                        response = client.post('/api/register/bulk/', rows, content_type='application/json')
+                        if response.status_code != 201:
+                            self.stderr.write(str(response.json())[:500])
+                    results[name] = time.perf_counter() - start
+                    raise Rollback
+            except Rollback:
+                pass
+
+        for name, elapsed in results.items():
+            self.stdout.write(f"{name}: {elapsed:.2f} s ({elapsed / count * 1000:.2f} ms/customer)")
+        self.stdout.write(self.style.SUCCESS(f"bulk speedup: {results['sequential'] / results['bulk']:.1f}x"))
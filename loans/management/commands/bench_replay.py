@@ -0,0 +1,98 @@
+import io
+import json
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import override_settings
+
+from credit_system.db import pool_stats
+from loans.models import Customer, Loan
+
+
+class Command(BaseCommand):
+    help = ('Replay a mix of read and scoring requests through the full Django stack and report latency; '
+            'run with DB_POOL=true, and with DB_POOL=false at DB_CONN_MAX_AGE=0 and >0, to compare connection handling')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        customer_ids = list(Customer.objects.values_list('id', flat=True)[:1000])
+        loan_ids = list(Loan.objects.values_list('id', flat=True)[:1000])
+        if not customer_ids or not loan_ids:
+            raise CommandError('No data to replay; run generate_data first.')
+        # The replay thread must not hold a connection of its own.
+        connections.close_all()
+
+        rng = random.Random(options['seed'])
+        plan = []
+        for _ in range(options['requests']):
+            kind = rng.choices(['view-loans', 'view-loan', 'check-eligibility'], [4, 4, 2])[0]
+            if kind == 'view-loans':
+                plan.append(('get', f'/api/view-loans/{rng.choice(customer_ids)}/', None))
+            elif kind == 'view-loan':
+                plan.append(('get', f'/api/view-loan/{rng.choice(loan_ids)}/', None))
+            else:
+                plan.append(('post', '/api/check-eligibility/', {
+                    'customer_id': rng.choice(customer_ids), 'loan_amount': rng.randint(10000, 1000000),
+                    'interest_rate': 10, 'tenure': rng.choice([6, 12, 24, 36]),
+                }))
+
+        handler = WSGIHandler()
+
+        def replay(request):
+            # Straight through the WSGI handler, as gunicorn would call it, so
+            # request_started/request_finished run and connections are
+            # returned to the pool or closed exactly as in production. (The
+            # test Client disconnects those handlers.)
+            method, url, data = request
+            body = json.dumps(data).encode() if data is not None else b''
+            environ = {
+                'REQUEST_METHOD': method.upper(), 'PATH_INFO': url, 'QUERY_STRING': '',
+                'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'REMOTE_ADDR': '127.0.0.1',
+                'CONTENT_TYPE': 'application/json', 'CONTENT_LENGTH': str(len(body)),
+                'wsgi.input': io.BytesIO(body), 'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+            }
+            status_line = []
+            start = time.perf_counter()
+            response = handler(environ, lambda status, headers: status_line.append(status))
+            try:
+                b''.join(response)
+            finally:
+                response.close()
+            return (time.perf_counter() - start) * 1000, int(status_line[0].split()[0])
+
+        # Admission control would shed part of the replay; switch it off. The
+        # in-flight bound stays finite (it sizes the slot list), with headroom
+        # for slots a finishing request has not released yet.
+        unlimited = {'CLIENT_BURST': 10 ** 9, 'GLOBAL_BURST': 10 ** 9, 'MAX_IN_FLIGHT': 2 * options['concurrency']}
+        with override_settings(ADMISSION_CONTROL=unlimited):
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+                results = list(executor.map(replay, plan))
+            elapsed = time.perf_counter() - start
+
+        latencies = sorted(ms for ms, _ in results)
+        errors = sum(1 for _, code in results if code >= 500)
+        quantiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(results)} requests in {elapsed:.2f} s ({len(results) / elapsed:.0f} req/s), {errors} errors"
+        ))
+        self.stdout.write(f"p50 {quantiles[49]:.2f} ms  p95 {quantiles[94]:.2f} ms  p99 {quantiles[98]:.2f} ms")
+        for alias, stats in pool_stats().items():
+            if stats['pooled']:
+                self.stdout.write(
+                    f"pool {alias}: size {stats['pool_size']}/{stats['pool_max']}, "
+                    f"saturation {stats['saturation']:.0%}, avg wait {stats['avg_wait_ms']:.2f} ms, "
+                    f"waiting {stats.get('requests_waiting', 0)}"
+                )
+            else:
+                self.stdout.write(f"pool {alias}: not pooled")
@@ -0,0 +1,82 @@
+import os
+import re
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+# Each probe runs in a fresh interpreter so nothing is already imported.
+PROBES = {
+    'app import': (
+        "import django; django.setup(); "
+        "import loans.views, loans.utils, loans.serializers, loans.urls"
+    ),
+    'first request': (
+        "import django; django.setup(); "
+        "from django.test import Client; "
+        "assert Client().get('/api/').status_code == 200"
+    ),
+    'worker ready': (
+        "import django; django.setup(); "
+        "from credit_system.celery import app; "
+        "app.loader.import_default_modules(); app.finalize()"
+    ),
+}
+
+HEAVY_MODULES = ('pandas', 'openpyxl', 'numpy')
+
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$')
+
+
+class Command(BaseCommand):
+    help = 'Measure process startup: import time, time to first request and time to Celery worker ready'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per probe; the best wall time is reported')
+        parser.add_argument('--top', type=int, default=10, help='Number of slowest top-level imports to list')
+
+    def handle(self, *args, **options):
+        for name, code in PROBES.items():
+            wall = min(self._run(code)[0] for _ in range(options['repeat']))
+            _, stderr = self._run(code, importtime=True)
+            imports = self._parse_importtime(stderr)
+
+            total_us = sum(cumulative for _, cumulative, depth in imports if depth == 0)
+            loaded = {module.split('.')[0] for module, _, _ in imports}
+            heavy = [m for m in HEAVY_MODULES if m in loaded]
+
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: {wall * 1000:.0f} ms wall, {total_us / 1000:.0f} ms in imports"
+            ))
+            self.stdout.write(f"  heavy modules loaded: {', '.join(heavy) or 'none'}")
+            slowest = sorted((i for i in imports if i[2] == 0), key=lambda i: i[1], reverse=True)
+            for module, cumulative, _ in slowest[:options['top']]:
+                self.stdout.write(f"  {cumulative / 1000:8.1f} ms  {module}")
+
+    def _run(self, code, importtime=False):
+        cmd = [sys.executable]
+        if importtime:
+            cmd += ['-X', 'importtime']
+        cmd += ['-c', code]
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+        start = time.perf_counter()
+        result = subprocess.run(cmd, cwd=settings.BASE_DIR, capture_output=True, text=True, env=env)
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            self.stderr.write(result.stderr)
+        return elapsed, result.stderr
+
+    @staticmethod
+    def _parse_importtime(stderr):
+        """Return (module, cumulative_us, depth) for each `-X importtime` line."""
+        imports = []
+        for line in stderr.splitlines():
+            match = IMPORTTIME_RE.match(line)
+            if match:
+                depth = len(match.group(3)) // 2
+                imports.append((match.group(4), int(match.group(2)), depth))
+        return imports
+
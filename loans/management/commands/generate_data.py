@@ -0,0 +1,291 @@
+import csv
+import io
+import os
+import random
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from loans.archive import add_months
+from loans.models import ArchivedLoan, Customer, Loan
+from loans.utils import calculate_emi
+
+
+# Column headers per layout. 'sheet' matches data/*.xlsx and the import_excel
+# command; 'tasks' matches what loans/tasks.py reads.
+CUSTOMER_HEADERS = {
+    'sheet': ['Customer ID', 'First Name', 'Last Name', 'Age', 'Phone Number', 'Monthly Salary', 'Approved Limit'],
+    'tasks': ['customer_id', 'first_name', 'last_name', 'age', 'phone_number', 'monthly_salary', 'approved_limit'],
+}
+LOAN_HEADERS = {
+    'sheet': ['Customer ID', 'Loan ID', 'Loan Amount', 'Tenure', 'Interest Rate', 'Monthly payment',
+              'EMIs paid on Time', 'Date of Approval', 'End Date'],
+    'tasks': ['customer id', 'loan id', 'loan amount', 'tenure', 'interest rate', 'monthly repayment (emi)',
+              'emis paid on time', 'start date', 'end date'],
+}
+
+FIRST_NAMES = ('Aaron', 'Abbey', 'Abbie', 'Adam', 'Aisha', 'Amit', 'Ana', 'Arjun', 'Ben', 'Chloe', 'Dev', 'Diya',
+               'Elena', 'Farah', 'Gaurav', 'Hana', 'Ishaan', 'Jade', 'Kabir', 'Lena', 'Maya', 'Neil', 'Omar',
+               'Priya', 'Rahul', 'Sara', 'Tara', 'Usha', 'Vikram', 'Zoe')
+LAST_NAMES = ('Garcia', 'Gonzalez', 'Rodrigues', 'Sharma', 'Patel', 'Khan', 'Smith', 'Nair', 'Iyer', 'Das',
+              'Mehta', 'Reddy', 'Singh', 'Brown', 'Lopez', 'Kapoor', 'Joshi', 'Bose', 'Rao', 'Wilson')
+TENURES = (3, 6, 12, 18, 24, 36, 48, 60, 84, 120, 144, 180)
+TENURE_WEIGHTS = (2, 6, 12, 6, 10, 12, 6, 8, 4, 3, 2, 1)
+
+# xlsx sheets cannot hold more rows than this (header included)
+XLSX_MAX_ROWS = 1048576
+
+# A fixed default rather than today, so the same seed gives the same data on
+# any day. Ages, dates of birth and customer timestamps are relative to it.
+DEFAULT_END_DATE = date(2025, 1, 1)
+
+
+def generate_customers(rng, count, first_id):
+    """Yield customer dicts with ids first_id .. first_id + count - 1."""
+    for customer_id in range(first_id, first_id + count):
+        salary = int(round(rng.lognormvariate(11.0, 0.6), -3))
+        yield {
+            'id': customer_id,
+            'first_name': rng.choice(FIRST_NAMES),
+            'last_name': rng.choice(LAST_NAMES),
+            'age': rng.randint(21, 70),
+            # id-derived so phones are unique across runs with different offsets
+            'phone': f'9{customer_id:09d}',
+            'monthly_salary': salary,
+            'approved_limit': round(salary * 36 / 100000) * 100000,
+        }
+
+
+def generate_loans(rng, count, first_id, first_customer_id, customers, skew, start, end):
+    """Yield loan dicts; customers are drawn with a power-law skew towards low ids."""
+    days = (end - start).days
+    for loan_id in range(first_id, first_id + count):
+        # skew=1 is uniform; larger values give a few customers many loans
+        customer_offset = min(int(customers * rng.random() ** skew), customers - 1)
+        tenure = rng.choices(TENURES, TENURE_WEIGHTS)[0]
+        amount = min(max(int(round(rng.lognormvariate(12.5, 0.9), -4)), 10000), 50000000)
+        rate = round(rng.uniform(5.0, 18.0), 2)
+        approved_on = start + timedelta(days=rng.randint(0, days))
+        end_on = add_months(approved_on, tenure)
+        elapsed = max(0, min(tenure, (end - approved_on).days // 30))
+        yield {
+            'id': loan_id,
+            'customer_id': first_customer_id + customer_offset,
+            'amount': amount,
+            'tenure': tenure,
+            'interest_rate': rate,
+            'monthly_installment': calculate_emi(amount, tenure, rate),
+            'emis_paid_on_time': rng.randint(int(elapsed * 0.7), elapsed),
+            'approved_on': approved_on,
+            'end_on': end_on,
+        }
+
+
+def customer_row(c):
+    return [c['id'], c['first_name'], c['last_name'], c['age'], c['phone'], c['monthly_salary'], c['approved_limit']]
+
+
+def loan_row(l):
+    return [l['customer_id'], l['id'], l['amount'], l['tenure'], l['interest_rate'], l['monthly_installment'],
+            l['emis_paid_on_time'], l['approved_on'], l['end_on']]
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+@contextmanager
+def explicit_timestamps(model):
+    """Let bulk_create keep the created_at/updated_at values we set."""
+    fields = [f for f in model._meta.concrete_fields if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)]
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = ('Generate deterministic synthetic customers and loans, either into the database '
+            'or as xlsx/CSV files in the customer_data/loan_data layout')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=300)
+        parser.add_argument('--loans', type=int, default=800)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--skew', type=float, default=2.0,
+                            help='Loans-per-customer skew; 1.0 is uniform, higher concentrates loans')
+        parser.add_argument('--start-date', type=date.fromisoformat, default=date(2010, 1, 1))
+        parser.add_argument('--end-date', type=date.fromisoformat, default=DEFAULT_END_DATE)
+        parser.add_argument('--output', choices=['db', 'csv', 'xlsx'], default='db')
+        parser.add_argument('--out-dir', default='data/generated', help='Directory for csv/xlsx output')
+        parser.add_argument('--layout', choices=sorted(CUSTOMER_HEADERS), default='sheet',
+                            help='File headers: import_excel/data/*.xlsx (sheet) or loans/tasks.py (tasks)')
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        if options['customers'] < 1:
+            raise CommandError('--customers must be at least 1')
+        if options['end_date'] < options['start_date']:
+            raise CommandError('--end-date must not be before --start-date')
+
+        if options['output'] == 'db':
+            first_customer_id = (Customer.objects.aggregate(m=Max('id'))['m'] or 0) + 1
+            first_loan_id = max(
+                Loan.objects.aggregate(m=Max('id'))['m'] or 0,
+                ArchivedLoan.objects.aggregate(m=Max('id'))['m'] or 0,
+            ) + 1
+        else:
+            if options['output'] == 'xlsx' and max(options['customers'], options['loans']) >= XLSX_MAX_ROWS:
+                raise CommandError(f'xlsx sheets hold at most {XLSX_MAX_ROWS - 1} rows; use --output csv')
+            first_customer_id = first_loan_id = 1
+
+        # Separate streams so changing --loans never changes the customers.
+        customers = generate_customers(
+            random.Random(f"{options['seed']}:customers"), options['customers'], first_customer_id,
+        )
+        loans = generate_loans(
+            random.Random(f"{options['seed']}:loans"), options['loans'], first_loan_id, first_customer_id,
+            options['customers'], options['skew'], options['start_date'], options['end_date'],
+        )
+
+        if options['output'] == 'db':
+            self._write_db(customers, loans, options['batch_size'], options['end_date'])
+        else:
+            self._write_files(customers, loans, options)
+
+    def _write_files(self, customers, loans, options):
+        out_dir = options['out_dir']
+        os.makedirs(out_dir, exist_ok=True)
+        layout = options['layout']
+        writer = self._write_xlsx if options['output'] == 'xlsx' else self._write_csv
+        ext = options['output']
+
+        for name, headers, rows in (
+            ('customer_data', CUSTOMER_HEADERS[layout], map(customer_row, customers)),
+            ('loan_data', LOAN_HEADERS[layout], map(loan_row, loans)),
+        ):
+            path = os.path.join(out_dir, f'{name}.{ext}')
+            count = writer(path, headers, rows)
+            self.stdout.write(self.style.SUCCESS(f'Wrote {count} rows to {path}'))
+
+    @staticmethod
+    def _write_csv(path, headers, rows):
+        count = 0
+        with open(path, 'w', newline='') as fh:
+            writer = csv.writer(fh)
+            writer.writerow(headers)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        return count
+
+    @staticmethod
+    def _write_xlsx(path, headers, rows):
+        from openpyxl import Workbook
+
+        # write_only workbooks stream rows to disk instead of keeping cells in memory
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(headers)
+        count = 0
+        for row in rows:
+            sheet.append(row)
+            count += 1
+        workbook.save(path)
+        return count
+
+    def _write_db(self, customers, loans, batch_size, as_of):
+        use_copy = connection.vendor == 'postgresql'
+        created = 0
+        for batch in batched(customers, batch_size):
+            rows = [self._customer_values(c, as_of) for c in batch]
+            with transaction.atomic():
+                if use_copy:
+                    self._copy(Customer, rows)
+                else:
+                    with explicit_timestamps(Customer):
+                        Customer.objects.bulk_create([Customer(**values) for values in rows])
+            created += len(rows)
+        self.stdout.write(self.style.SUCCESS(f'Inserted {created} customers'))
+
+        created = 0
+        for batch in batched(loans, batch_size):
+            rows = [self._loan_values(l) for l in batch]
+            with transaction.atomic():
+                if use_copy:
+                    self._copy(Loan, rows)
+                else:
+                    with explicit_timestamps(Loan):
+                        Loan.objects.bulk_create([Loan(**values) for values in rows])
+            created += len(rows)
+            if created % (batch_size * 10) == 0:
+                self.stdout.write(f'  {created} loans')
+        self.stdout.write(self.style.SUCCESS(f'Inserted {created} loans'))
+
+        # Explicit ids bypass the sequences; move them past the generated rows.
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Customer, Loan]):
+                cursor.execute(sql)
+
+    @staticmethod
+    def _customer_values(c, as_of):
+        registered_at = datetime.combine(as_of, time(), tzinfo=dt_timezone.utc)
+        return {
+            'id': c['id'],
+            'first_name': c['first_name'],
+            'last_name': c['last_name'],
+            'email': f"synthetic_{c['id']}@local.invalid",
+            'phone': c['phone'],
+            'date_of_birth': date(as_of.year - c['age'], 1, 1),
+            'age': c['age'],
+            'monthly_income': c['monthly_salary'],
+            'approved_limit': c['approved_limit'],
+            'created_at': registered_at,
+            'updated_at': registered_at,
+        }
+
+    @staticmethod
+    def _loan_values(l):
+        created_at = datetime.combine(l['approved_on'], time(), tzinfo=dt_timezone.utc)
+        return {
+            'id': l['id'],
+            'customer_id': l['customer_id'],
+            'amount': l['amount'],
+            'term_months': l['tenure'],
+            'interest_rate': l['interest_rate'],
+            'monthly_installment': l['monthly_installment'],
+            'status': 'APPROVED',
+            'created_at': created_at,
+            'updated_at': created_at,
+        }
+
+    @staticmethod
+    def _copy(model, rows):
+        """Load rows with PostgreSQL COPY, which is far cheaper than INSERTs at this scale."""
+        columns = list(rows[0])
+        db_columns = [model._meta.get_field(name).column for name in columns]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for values in rows:
+            writer.writerow(['' if values[name] is None else values[name] for name in columns])
+        sql = (f'COPY {connection.ops.quote_name(model._meta.db_table)} '
+               f'({", ".join(connection.ops.quote_name(c) for c in db_columns)}) FROM STDIN WITH (FORMAT csv)')
+        with connection.cursor() as cursor:
+            raw = cursor.cursor
+            if hasattr(raw, 'copy_expert'):  # psycopg2
+                buffer.seek(0)
+                raw.copy_expert(sql, buffer)
+            else:  # psycopg 3
+                with raw.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
@@ -1,5 +1,4 @@
 from django.core.management.base import BaseCommand, CommandError
-import pandas as pd
 from loans.models import Customer, Loan
 from django.utils.dateparse import parse_date
 
@@ -11,6 +10,10 @@ class Command(BaseCommand):
         parser.add_argument('--data-dir', type=str, default='/app/data', help='Directory containing Excel files')
 
     def handle(self, *args, **options):
+        # Imported here rather than at module level to keep pandas out of
+        # process startup.
+        import pandas as pd
+
         data_dir = options['data_dir']
         cust_path = f"{data_dir}/customer_data.xlsx"
         loan_path = f"{data_dir}/loan_data.xlsx"
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from loans import outbox, rollups
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the LoanRollup table from Loan and ArchivedLoan. Run it after bulk imports, '
+            'which bypass the outbox, ideally while loan writes are paused')
+
+    def handle(self, *args, **options):
+        # Apply queued events first so they are not counted again afterwards.
+        drained = 0
+        while count := outbox.relay():
+            drained += count
+        # Events held back behind a failing one would be applied on top of the
+        # rebuilt totals once they go through, counting their loans twice.
+        held = outbox.pending_events().filter(event_type__in=rollups.ROLLUP_EVENT_TYPES).count()
+        if held:
+            raise CommandError(
+                f'{held} loan events are held back behind failing outbox events; '
+                'fix or park those (see OutboxEvent.last_error) and run this again'
+            )
+        rows = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Applied {drained} pending events; rebuilt {rows} rollup rows'))
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:16
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+# Admin search uses prefix lookups (istartswith), which Django renders as
+# UPPER("col"::text) LIKE UPPER('term%'). These trigram indexes match that
+# expression. They only exist on PostgreSQL, and only where the pg_trgm
+# extension is installed; elsewhere search falls back to exact matches or an
+# unindexed prefix scan (see loans/admin.py).
+#
+# Every index here is built on a table that may already hold millions of rows,
+# so on PostgreSQL they are created CONCURRENTLY (outside a transaction) to
+# keep the tables writable while they build.
+TRIGRAM_INDEXES = [
+    ('loans_customer_first_name_trgm', 'first_name'),
+    ('loans_customer_last_name_trgm', 'last_name'),
+    ('loans_customer_email_trgm', 'email'),
+    ('loans_customer_phone_trgm', 'phone'),
+]
+
+
+class AddIndexConcurrentlyOnPostgres(AddIndexConcurrently):
+    """``AddIndexConcurrently`` on PostgreSQL, a plain ``AddIndex`` elsewhere."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        return migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        return migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON loans_customer '
+            f'USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('loans', '0002_loan_archive'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyOnPostgres(
+            model_name='customer',
+            index=models.Index(fields=['first_name'], name='loans_customer_first_name_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='customer',
+            index=models.Index(fields=['last_name'], name='loans_customer_last_name_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='loan',
+            index=models.Index(fields=['status', 'id'], name='loans_loan_status_id_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
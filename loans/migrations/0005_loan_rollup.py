@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0004_outbox_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('APPROVED', 'Approved'), ('REJECTED', 'Rejected')], max_length=10)),
+                ('tenure_band', models.CharField(max_length=10)),
+                ('amount_band', models.CharField(max_length=10)),
+                ('loan_count', models.BigIntegerField(default=0)),
+                ('amount_sum', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('month', 'status', 'tenure_band', 'amount_band'), name='loans_rollup_key_unique')],
+            },
+        ),
+    ]
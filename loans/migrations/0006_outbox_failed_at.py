@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0005_loan_rollup'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='outboxevent',
+            name='loans_outbox_pending_idx',
+        ),
+        migrations.AddField(
+            model_name='outboxevent',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(condition=models.Q(('failed_at__isnull', True), ('processed_at__isnull', True)), fields=['id'], name='loans_outbox_pending_idx'),
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Case, Q, Value, When
+from django.utils import timezone
 
 class Customer(models.Model):
     first_name = models.CharField(max_length=50)
@@ -6,15 +8,46 @@ class Customer(models.Model):
     email = models.EmailField(unique=True)
     phone = models.CharField(max_length=15, unique=True)
     date_of_birth = models.DateField()
+    age = models.PositiveIntegerField(null=True, blank=True)
+    monthly_income = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    approved_limit = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Exact-match admin search on backends without trigram indexes
+        indexes = [
+            models.Index(fields=['first_name'], name='loans_customer_first_name_idx'),
+            models.Index(fields=['last_name'], name='loans_customer_last_name_idx'),
+        ]
+
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
 
 
+class LoanQuerySet(models.QuerySet):
+    def apply_decision(self):
+        """Apply the approval rule to every loan in the queryset.
+
+        Issues a single ``UPDATE ... SET status = CASE ...`` statement and
+        returns the number of rows updated.
+        """
+        return self.update(status=self.decision_expression(), updated_at=timezone.now())
+
+    @staticmethod
+    def decision_expression():
+        """SQL equivalent of ``Loan.decide_status``."""
+        return Case(
+            When(amount__lte=Loan.APPROVAL_AMOUNT_LIMIT, then=Value('APPROVED')),
+            default=Value('REJECTED'),
+            output_field=models.CharField(),
+        )
+
+
 class Loan(models.Model):
+    APPROVAL_AMOUNT_LIMIT = 5000
+
     STATUS_CHOICES = [
         ('PENDING', 'Pending'),
         ('APPROVED', 'Approved'),
@@ -24,20 +57,121 @@ class Loan(models.Model):
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='loans')
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     term_months = models.PositiveIntegerField()
+    interest_rate = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    monthly_installment = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = LoanQuerySet.as_manager()
+
+    class Meta:
+        # Admin changelist filtered by status, newest first
+        indexes = [
+            models.Index(fields=['status', 'id'], name='loans_loan_status_id_idx'),
+        ]
+
     def __str__(self):
         return f"Loan {self.id} for {self.customer}"
-    def approve_or_reject(self):
+
+    @classmethod
+    def decide_status(cls, amount):
         """
         Example logic:
         - Approve if amount <= 5000
         - Reject if amount > 5000
         """
-        if self.amount <= 5000:
-            self.status = 'APPROVED'
-        else:
-            self.status = 'REJECTED'
+        return 'APPROVED' if amount <= cls.APPROVAL_AMOUNT_LIMIT else 'REJECTED'
+
+    def approve_or_reject(self):
+        self.status = self.decide_status(self.amount)
         self.save()
+
+
+class ArchivedLoan(models.Model):
+    """Cold storage for loans whose tenure has ended.
+
+    Rows keep the original loan id and the fields scoring and the read
+    endpoints need; see loans/archive.py for how they get here.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='archived_loans')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    term_months = models.PositiveIntegerField()
+    interest_rate = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    monthly_installment = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=Loan.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived loan {self.id} for {self.customer}"
+
+    @classmethod
+    def from_loan(cls, loan):
+        return cls(
+            id=loan.id,
+            customer_id=loan.customer_id,
+            amount=loan.amount,
+            term_months=loan.term_months,
+            interest_rate=loan.interest_rate,
+            monthly_installment=loan.monthly_installment,
+            status=loan.status,
+            created_at=loan.created_at,
+        )
+
+
+class OutboxEvent(models.Model):
+    """A loan or customer change, written in the same transaction as the change.
+
+    ``loans.outbox.relay`` drains unprocessed events in id order and applies
+    them to derived data (score cache, aggregates). ``customer_id`` is the
+    ordering key: events for one customer are always handled in the order
+    they were written. ``failed_at`` marks an event parked after repeated
+    failures; the relay no longer picks it up.
+    """
+    event_type = models.CharField(max_length=50)
+    customer_id = models.BigIntegerField(null=True, blank=True)
+    loan_id = models.BigIntegerField(null=True, blank=True)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    failed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['id'], condition=Q(processed_at__isnull=True, failed_at__isnull=True),
+                name='loans_outbox_pending_idx',
+            ),
+            models.Index(fields=['processed_at'], name='loans_outbox_processed_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} #{self.id}"
+
+
+class LoanRollup(models.Model):
+    """Loan counts and amounts per (month, status, tenure band, amount band).
+
+    Kept up to date from outbox events by loans/rollups.py and rebuilt from
+    scratch with ``manage.py rebuild_rollups``.
+    """
+    month = models.DateField()
+    status = models.CharField(max_length=10, choices=Loan.STATUS_CHOICES)
+    tenure_band = models.CharField(max_length=10)
+    amount_band = models.CharField(max_length=10)
+    loan_count = models.BigIntegerField(default=0)
+    amount_sum = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['month', 'status', 'tenure_band', 'amount_band'], name='loans_rollup_key_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.status} {self.tenure_band} {self.amount_band}"
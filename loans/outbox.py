@@ -0,0 +1,166 @@
+"""Transactional outbox for loan and customer writes.
+
+Request handlers call the ``record_*`` helpers inside the transaction that
+writes the loan or customer, which costs one extra INSERT. Everything derived
+from that write (the credit score cache, aggregates) is done later by
+``relay``, run from the ``loans.tasks.relay_outbox_events`` Celery task.
+
+Delivery is at least once: an event is marked processed in the same
+transaction as its handlers' database work, but a crash after a handler
+touched the cache re-delivers it, so handlers must be idempotent. Events are
+handled in id order. When one fails, later events with the same
+``customer_id`` are held back until it succeeds, which keeps every customer's
+events in order without stalling everyone else. After ``MAX_ATTEMPTS``
+failures the event is parked (``failed_at`` is set) and logged, so that
+customer's later events can go through.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import OutboxEvent
+from .utils import invalidate_cached_credit_scores, refresh_cached_credit_score
+
+logger = logging.getLogger(__name__)
+
+EVENT_HANDLERS = defaultdict(list)
+
+MAX_ATTEMPTS = 5
+
+
+def handles(*event_types):
+    """Register a handler, called with the OutboxEvent, for the given event types."""
+    def register(handler):
+        for event_type in event_types:
+            EVENT_HANDLERS[event_type].append(handler)
+        return handler
+    return register
+
+
+def loan_snapshot(loan):
+    return {
+        'id': loan.id,
+        'customer_id': loan.customer_id,
+        'amount': str(loan.amount),
+        'term_months': loan.term_months,
+        'status': loan.status,
+        'created_at': loan.created_at.isoformat() if loan.created_at else None,
+    }
+
+
+def record_loan_event(event_type, loan, previous=None):
+    payload = {'loan': loan_snapshot(loan)}
+    if previous is not None:
+        payload['previous'] = previous
+    return OutboxEvent.objects.create(
+        event_type=event_type, customer_id=loan.customer_id, loan_id=loan.id, payload=payload,
+    )
+
+
+def record_loan_events(event_type, loans):
+    """One event per loan, inserted with a single bulk_create."""
+    return OutboxEvent.objects.bulk_create([
+        OutboxEvent(event_type=event_type, customer_id=loan.customer_id, loan_id=loan.id,
+                    payload={'loan': loan_snapshot(loan)})
+        for loan in loans
+    ])
+
+
+def record_customer_event(event_type, customer):
+    return OutboxEvent.objects.create(event_type=event_type, customer_id=customer.id)
+
+
+def record_event(event_type, customer_id=None, payload=None):
+    """An event not tied to a single loan, e.g. a portfolio-wide adjustment."""
+    return OutboxEvent.objects.create(event_type=event_type, customer_id=customer_id, payload=payload or {})
+
+
+def record_customers_event(event_type, customer_ids, payload=None):
+    """One event per customer, inserted with a single bulk_create."""
+    return OutboxEvent.objects.bulk_create([
+        OutboxEvent(event_type=event_type, customer_id=customer_id, payload=payload or {})
+        for customer_id in customer_ids
+    ])
+
+
+def pending_events():
+    return OutboxEvent.objects.filter(processed_at__isnull=True, failed_at__isnull=True)
+
+
+def relay(batch_size=500):
+    """Handle up to ``batch_size`` pending events in id order.
+
+    Rows are locked with SELECT ... FOR UPDATE, so a second relay running at
+    the same time waits instead of handling later events first. Returns the
+    number of events processed.
+    """
+    processed = []
+    blocked = set()
+    with transaction.atomic():
+        events = list(pending_events().order_by('id').select_for_update()[:batch_size])
+        for event in events:
+            if event.customer_id in blocked:
+                continue
+            try:
+                with transaction.atomic():
+                    for handler in EVENT_HANDLERS.get(event.event_type, ()):
+                        handler(event)
+            except Exception as exc:
+                attempts = event.attempts + 1
+                failed_at = None
+                if attempts >= MAX_ATTEMPTS:
+                    failed_at = timezone.now()
+                    logger.exception('Outbox event %s failed %d times; parked', event.id, attempts)
+                else:
+                    blocked.add(event.customer_id)
+                    logger.exception(
+                        'Outbox event %s failed; holding later events for customer %s', event.id, event.customer_id,
+                    )
+                OutboxEvent.objects.filter(pk=event.pk).update(
+                    attempts=attempts, last_error=repr(exc), failed_at=failed_at,
+                )
+                continue
+            processed.append(event.pk)
+
+        OutboxEvent.objects.filter(pk__in=processed).update(processed_at=timezone.now())
+    return len(processed)
+
+
+def outbox_lag():
+    """Pending and parked event counts, and the age in seconds of the oldest pending event."""
+    pending = pending_events()
+    oldest = pending.aggregate(oldest=Min('created_at'))['oldest']
+    return {
+        'pending': pending.count(),
+        'failed': OutboxEvent.objects.filter(failed_at__isnull=False).count(),
+        'lag_seconds': (timezone.now() - oldest).total_seconds() if oldest else 0.0,
+    }
+
+
+def purge_processed(older_than=timedelta(days=1)):
+    """Delete events processed before ``older_than`` ago; returns the count."""
+    deleted, _ = OutboxEvent.objects.filter(processed_at__lt=timezone.now() - older_than).delete()
+    return deleted
+
+
+@handles(
+    'loan.created', 'loan.updated', 'loan.deleted',
+    'customer.created', 'customer.updated', 'customer.deleted',
+)
+def refresh_credit_score(event):
+    refresh_cached_credit_score(event.customer_id)
+    # A loan.updated that moved the loan also changes the old owner's score.
+    previous_customer_id = event.payload.get('previous', {}).get('customer_id')
+    if previous_customer_id not in (None, event.customer_id):
+        refresh_cached_credit_score(previous_customer_id)
+
+
+@handles('loans.decided')
+def invalidate_credit_scores(event):
+    # A decided batch can span many customers; drop their entries in one call
+    # and let the next read score them.
+    invalidate_cached_credit_scores(event.payload['customer_ids'])
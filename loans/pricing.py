@@ -0,0 +1,51 @@
+"""Vectorised what-if pricing for the pricing-grid endpoint.
+
+Kept out of utils.py so numpy is only imported when a grid is requested.
+"""
+import numpy as np
+
+from .utils import get_corrected_interest
+
+
+def axis(min_value, max_value, steps, integer=False):
+    """Evenly spaced values from min_value to max_value inclusive."""
+    values = np.linspace(min_value, max_value, steps)
+    if integer:
+        values = np.unique(np.rint(values).astype(int))
+    return values
+
+
+def calculate_emi_grid(principals, tenures, annual_interest_rates):
+    """Vectorised ``utils.calculate_emi``.
+
+    Returns an array of shape (len(principals), len(tenures),
+    len(annual_interest_rates)) with every EMI rounded to 2 decimal places.
+    """
+    P = np.asarray(principals, dtype=float)[:, None, None]
+    n = np.asarray(tenures, dtype=float)[None, :, None]
+    r = np.asarray(annual_interest_rates, dtype=float)[None, None, :] / 100.0 / 12.0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = (1 + r) ** n
+        emi = np.where(r == 0, P / n, P * r * growth / (growth - 1))
+    emi = np.where(n <= 0, 0.0, emi)
+    return np.round(emi, 2)
+
+
+def pricing_grid(score, loan_amounts, tenures, interest_rates):
+    """Approval, corrected rates and the EMI matrix for one credit score.
+
+    The policy in ``get_corrected_interest`` only depends on the score, so it
+    is applied once per rate and the EMI is broadcast over the whole grid.
+    """
+    decisions = [get_corrected_interest(score, rate) for rate in interest_rates]
+    approval = decisions[0][0]
+    corrected = [rate for _, rate in decisions]
+    return {
+        'approval': approval,
+        'loan_amounts': [float(a) for a in loan_amounts],
+        'tenures': [int(t) for t in tenures],
+        'interest_rates': [float(r) for r in interest_rates],
+        'corrected_interest_rates': corrected,
+        'monthly_installment': calculate_emi_grid(loan_amounts, tenures, corrected).tolist(),
+    }
@@ -0,0 +1,53 @@
+"""Set-based bulk customer registration for the register/bulk/ endpoint."""
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from . import outbox
+from .models import Customer
+from .serializers import BulkCustomerRowSerializer
+
+MAX_BULK_CUSTOMERS = 5000
+
+
+def bulk_register(rows):
+    """Validate and insert a batch of customers, all or nothing.
+
+    Rows are validated field by field without touching the database, then
+    email and phone uniqueness is checked for the whole batch with one ``IN``
+    query per field, both against existing customers and within the batch.
+
+    Returns ``(customers, errors)``: the created customers, or an empty list
+    and a ``{row_index: {field: [messages]}}`` dict if any row is invalid.
+    """
+    errors = {}
+    valid = []
+    # One serializer for every row, so its fields are only built once
+    row_serializer = BulkCustomerRowSerializer()
+    for index, row in enumerate(rows):
+        try:
+            data = row_serializer.run_validation(row)
+        except ValidationError as exc:
+            errors[index] = exc.detail
+        else:
+            valid.append((index, row_serializer.prepare(dict(data))))
+
+    for field in BulkCustomerRowSerializer.UNIQUE_FIELDS:
+        values = [data[field] for _, data in valid]
+        existing = set(Customer.objects.filter(**{f'{field}__in': values}).values_list(field, flat=True))
+        first_seen = {}
+        for index, data in valid:
+            value = data[field]
+            if value in existing:
+                errors.setdefault(index, {})[field] = [f'customer with this {field} already exists.']
+            elif value in first_seen:
+                errors.setdefault(index, {})[field] = [f'duplicates row {first_seen[value]} in this batch.']
+            else:
+                first_seen[value] = index
+
+    if errors:
+        return [], dict(sorted(errors.items()))
+
+    with transaction.atomic():
+        customers = Customer.objects.bulk_create([Customer(**data) for _, data in valid])
+        outbox.record_customers_event('customer.created', [customer.id for customer in customers])
+    return customers, {}
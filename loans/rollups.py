@@ -0,0 +1,173 @@
+"""Portfolio rollups: loan counts and amounts by month, status and band.
+
+``LoanRollup`` rows are adjusted incrementally by outbox handlers (see
+loans/outbox.py), so loan writes never pay for them, and can be rebuilt from
+the Loan and ArchivedLoan tables with ``manage.py rebuild_rollups``.
+Archiving does not touch the rollups: archived loans stay in the portfolio.
+"""
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, CharField, Count, F, Sum, Value, When
+from django.db.models.functions import TruncMonth
+
+from .models import ArchivedLoan, Loan, LoanRollup
+from .outbox import handles, record_event
+
+# (exclusive upper bound, label); None marks the open-ended last band
+TENURE_BANDS = [(13, '0-12'), (25, '13-24'), (61, '25-60'), (None, '61+')]
+AMOUNT_BANDS = [(100000, '<1L'), (500000, '1L-5L'), (1000000, '5L-10L'), (None, '10L+')]
+
+# Outbox events whose handlers below adjust LoanRollup
+ROLLUP_EVENT_TYPES = ('loan.created', 'loan.updated', 'loan.deleted', 'rollups.adjusted')
+
+
+def band(value, bands):
+    for upper, label in bands:
+        if upper is None or value < upper:
+            return label
+
+
+def band_expression(field, bands):
+    """SQL CASE equivalent of ``band``, for aggregating in the database."""
+    whens = [When(**{f'{field}__lt': upper}, then=Value(label)) for upper, label in bands if upper is not None]
+    return Case(*whens, default=Value(bands[-1][1]), output_field=CharField())
+
+
+def snapshot_key(snapshot):
+    """Rollup key ``(month, status, tenure_band, amount_band)`` of a loan snapshot."""
+    created_at = datetime.fromisoformat(snapshot['created_at'])
+    return (
+        date(created_at.year, created_at.month, 1),
+        snapshot['status'],
+        band(snapshot['term_months'], TENURE_BANDS),
+        band(Decimal(snapshot['amount']), AMOUNT_BANDS),
+    )
+
+
+def grouped(queryset, status=None):
+    """``{key: [count, amount]}`` for a Loan or ArchivedLoan queryset, in one query.
+
+    ``status`` replaces the stored status with an expression, e.g. the status
+    a decision is about to assign.
+    """
+    rows = queryset.order_by().values(
+        rollup_month=TruncMonth('created_at'),
+        rollup_status=status if status is not None else F('status'),
+        tenure_band=band_expression('term_months', TENURE_BANDS),
+        amount_band=band_expression('amount', AMOUNT_BANDS),
+    ).annotate(loan_count=Count('id'), amount_sum=Sum('amount'))
+
+    totals = defaultdict(lambda: [0, Decimal('0')])
+    for row in rows:
+        month = row['rollup_month']
+        if isinstance(month, datetime):
+            month = month.date()
+        key = (month, row['rollup_status'], row['tenure_band'], row['amount_band'])
+        totals[key][0] += row['loan_count']
+        totals[key][1] += Decimal(row['amount_sum'])
+    return totals
+
+
+def merge(*totals):
+    merged = defaultdict(lambda: [0, Decimal('0')])
+    for total in totals:
+        for key, (count, amount) in total.items():
+            merged[key][0] += count
+            merged[key][1] += amount
+    return merged
+
+
+def subtract(minuend, subtrahend):
+    delta = merge(minuend)
+    for key, (count, amount) in subtrahend.items():
+        delta[key][0] -= count
+        delta[key][1] -= amount
+    return {key: value for key, value in delta.items() if value[0] or value[1]}
+
+
+def decision_delta(queryset):
+    """Rollup change that ``queryset.apply_decision()`` is about to make."""
+    return subtract(grouped(queryset, status=queryset.decision_expression()), grouped(queryset))
+
+
+def removal_delta(*querysets):
+    """Rollup change from deleting every loan in the querysets."""
+    return subtract({}, merge(*(grouped(queryset) for queryset in querysets)))
+
+
+def customer_removal_delta(customer_ids):
+    """Rollup change from deleting these customers with their loans (CASCADE).
+
+    Locks the loans and archived loans first, so the delta matches exactly
+    what the delete removes. Callers lock the customer rows, which also keeps
+    new loans from being added to them.
+    """
+    querysets = (
+        Loan.objects.filter(customer_id__in=customer_ids),
+        ArchivedLoan.objects.filter(customer_id__in=customer_ids),
+    )
+    for queryset in querysets:
+        list(queryset.select_for_update().values_list('pk', flat=True))
+    return removal_delta(*querysets)
+
+
+def record_rollup_delta(delta):
+    """Queue a set-based rollup adjustment (bulk decisions, cascading deletes)."""
+    if delta:
+        rows = [[key[0].isoformat(), *key[1:], count, str(amount)] for key, (count, amount) in delta.items()]
+        record_event('rollups.adjusted', payload={'delta': rows})
+
+
+def apply_delta(delta):
+    """Add ``{key: [count, amount]}`` to the rollup table."""
+    for (month, status, tenure_band, amount_band), (count, amount) in delta.items():
+        key = {'month': month, 'status': status, 'tenure_band': tenure_band, 'amount_band': amount_band}
+        updated = LoanRollup.objects.filter(**key).update(
+            loan_count=F('loan_count') + count, amount_sum=F('amount_sum') + amount,
+        )
+        if not updated:
+            LoanRollup.objects.create(**key, loan_count=count, amount_sum=amount)
+
+
+def recompute():
+    """Rollups computed from scratch over both the hot and archived loans."""
+    return merge(grouped(Loan.objects.all()), grouped(ArchivedLoan.objects.all()))
+
+
+def rebuild():
+    """Replace the rollup table with a full recomputation; returns the row count."""
+    totals = recompute()
+    with transaction.atomic():
+        LoanRollup.objects.all().delete()
+        LoanRollup.objects.bulk_create([
+            LoanRollup(month=month, status=status, tenure_band=tenure_band, amount_band=amount_band,
+                       loan_count=count, amount_sum=amount)
+            for (month, status, tenure_band, amount_band), (count, amount) in totals.items()
+        ])
+    return len(totals)
+
+
+@handles('loan.created', 'loan.updated', 'loan.deleted')
+def update_rollups(event):
+    delta = defaultdict(lambda: [0, Decimal('0')])
+    if event.event_type != 'loan.deleted':
+        key = snapshot_key(event.payload['loan'])
+        delta[key][0] += 1
+        delta[key][1] += Decimal(event.payload['loan']['amount'])
+    removed = event.payload['loan'] if event.event_type == 'loan.deleted' else event.payload.get('previous')
+    if removed:
+        key = snapshot_key(removed)
+        delta[key][0] -= 1
+        delta[key][1] -= Decimal(removed['amount'])
+    apply_delta({key: value for key, value in delta.items() if value[0] or value[1]})
+
+
+@handles('rollups.adjusted')
+def adjust_rollups(event):
+    apply_delta({
+        (date.fromisoformat(month), status, tenure_band, amount_band): (count, Decimal(amount))
+        for month, status, tenure_band, amount_band, count, amount in event.payload['delta']
+    })
@@ -1,5 +1,24 @@
+from datetime import date
 from rest_framework import serializers
-from .models import Customer, Loan
+from rest_framework.validators import UniqueValidator
+from .models import ArchivedLoan, Customer, Loan
+from .utils import calculate_approved_limit
+
+# Bounds on loan terms accepted by the scoring endpoints. Beyond them the EMI
+# maths overflows to inf/NaN, which JSON cannot render.
+MAX_LOAN_AMOUNT = 99999999.99   # Loan.amount is max_digits=10, decimal_places=2
+MAX_TENURE_MONTHS = 600
+MAX_INTEREST_RATE = 100
+MAX_GRID_CELLS = 2500
+
+# Explicit ids accepted by loans/decide/; larger sets go by status or customer
+MAX_DECIDE_IDS = 10000
+
+MIN_AGE = 18
+MAX_AGE = 120
+# Keeps calculate_approved_limit (36x income) within approved_limit's
+# max_digits=12, decimal_places=2.
+MAX_MONTHLY_INCOME = 10 ** 8
 
 class CustomerSerializer(serializers.ModelSerializer):
     class Meta:
@@ -13,21 +32,55 @@ class LoanSerializer(serializers.ModelSerializer):
 class CustomerRegisterSerializer(serializers.ModelSerializer):
     class Meta:
         model = Customer
-        fields = ['id', 'first_name', 'last_name', 'phone', 'monthly_income', 'approved_limit', 'age']
+        fields = ['id', 'first_name', 'last_name', 'email', 'phone', 'monthly_income', 'approved_limit', 'age']
+        read_only_fields = ['approved_limit']
+        extra_kwargs = {
+            'email': {'required': False},
+            'monthly_income': {
+                'required': True, 'allow_null': False, 'min_value': 0, 'max_value': MAX_MONTHLY_INCOME,
+            },
+            'age': {'required': True, 'allow_null': False, 'min_value': MIN_AGE, 'max_value': MAX_AGE},
+        }
+
+    @staticmethod
+    def prepare(validated_data):
+        """Fill in the fields registration derives rather than accepts.
+
+        Like import_excel: a placeholder email when none is given, and a
+        date of birth of Jan 1 of the birth year implied by ``age``.
+        """
+        validated_data['approved_limit'] = calculate_approved_limit(validated_data['monthly_income'])
+        validated_data.setdefault('email', f"phone_{validated_data['phone']}@local.invalid")
+        validated_data.setdefault('date_of_birth', date(date.today().year - validated_data['age'], 1, 1))
+        return validated_data
 
     # Override create to calculate approved_limit
     def create(self, validated_data):
-        monthly_salary = validated_data['monthly_income']
-        approved_limit = round(monthly_salary * 36 / 100000) * 100000  # nearest lakh
-        validated_data['approved_limit'] = approved_limit
-        return super().create(validated_data)
+        return super().create(self.prepare(validated_data))
+
+
+class BulkCustomerRowSerializer(CustomerRegisterSerializer):
+    """One row of a bulk registration.
+
+    Per-row unique validators would cost two queries per row; the bulk view
+    checks email and phone uniqueness for the whole batch instead.
+    """
+    UNIQUE_FIELDS = ('email', 'phone')
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name in self.UNIQUE_FIELDS:
+            fields[name].validators = [
+                v for v in fields[name].validators if not isinstance(v, UniqueValidator)
+            ]
+        return fields
 
 
 class LoanEligibilitySerializer(serializers.Serializer):
     customer_id = serializers.IntegerField()
-    loan_amount = serializers.FloatField()
-    interest_rate = serializers.FloatField()
-    tenure = serializers.IntegerField()
+    loan_amount = serializers.FloatField(min_value=0, max_value=MAX_LOAN_AMOUNT)
+    interest_rate = serializers.FloatField(min_value=0, max_value=MAX_INTEREST_RATE)
+    tenure = serializers.IntegerField(min_value=1, max_value=MAX_TENURE_MONTHS)
 
 class LoanEligibilityResponseSerializer(serializers.Serializer):
     customer_id = serializers.IntegerField()
@@ -38,11 +91,50 @@ class LoanEligibilityResponseSerializer(serializers.Serializer):
     monthly_installment = serializers.FloatField()
 
 
+class GridRangeSerializer(serializers.Serializer):
+    min = serializers.FloatField()
+    max = serializers.FloatField()
+    steps = serializers.IntegerField(min_value=1, max_value=100, default=1)
+
+    def validate(self, attrs):
+        if attrs['min'] > attrs['max']:
+            raise serializers.ValidationError('min must not be greater than max')
+        return attrs
+
+
+class AmountRangeSerializer(GridRangeSerializer):
+    min = serializers.FloatField(min_value=0, max_value=MAX_LOAN_AMOUNT)
+    max = serializers.FloatField(min_value=0, max_value=MAX_LOAN_AMOUNT)
+
+
+class TenureRangeSerializer(GridRangeSerializer):
+    min = serializers.FloatField(min_value=1, max_value=MAX_TENURE_MONTHS)
+    max = serializers.FloatField(min_value=1, max_value=MAX_TENURE_MONTHS)
+
+
+class RateRangeSerializer(GridRangeSerializer):
+    min = serializers.FloatField(min_value=0, max_value=MAX_INTEREST_RATE)
+    max = serializers.FloatField(min_value=0, max_value=MAX_INTEREST_RATE)
+
+
+class PricingGridSerializer(serializers.Serializer):
+    customer_id = serializers.IntegerField()
+    loan_amount = AmountRangeSerializer()
+    tenure = TenureRangeSerializer()
+    interest_rate = RateRangeSerializer()
+
+    def validate(self, attrs):
+        cells = attrs['loan_amount']['steps'] * attrs['tenure']['steps'] * attrs['interest_rate']['steps']
+        if cells > MAX_GRID_CELLS:
+            raise serializers.ValidationError(f'grid has {cells} cells; at most {MAX_GRID_CELLS} are allowed')
+        return attrs
+
+
 class LoanCreateSerializer(serializers.Serializer):
     customer_id = serializers.IntegerField()
-    loan_amount = serializers.FloatField()
-    interest_rate = serializers.FloatField()
-    tenure = serializers.IntegerField()
+    loan_amount = serializers.FloatField(min_value=0, max_value=MAX_LOAN_AMOUNT)
+    interest_rate = serializers.FloatField(min_value=0, max_value=MAX_INTEREST_RATE)
+    tenure = serializers.IntegerField(min_value=1, max_value=MAX_TENURE_MONTHS)
 
 class LoanCreateResponseSerializer(serializers.Serializer):
     loan_id = serializers.IntegerField(allow_null=True)
@@ -64,3 +156,41 @@ class LoanDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Loan
         fields = ['id', 'customer', 'amount', 'interest_rate', 'monthly_installment', 'term_months']
+
+
+class ArchivedLoanDetailSerializer(LoanDetailSerializer):
+    class Meta(LoanDetailSerializer.Meta):
+        model = ArchivedLoan
+
+
+class LoanDecisionFilterSerializer(serializers.Serializer):
+    FILTERS = ('status', 'customer', 'ids')
+
+    status = serializers.ChoiceField(choices=Loan.STATUS_CHOICES, required=False)
+    customer = serializers.IntegerField(required=False)
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=MAX_DECIDE_IDS)
+    all = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, attrs):
+        # Re-deciding the whole table has to be asked for explicitly
+        if not attrs['all'] and not any(name in attrs for name in self.FILTERS):
+            raise serializers.ValidationError(
+                f'Give at least one of {list(self.FILTERS)}, or "all": true to re-decide every loan'
+            )
+        return attrs
+
+
+class PortfolioAnalyticsQuerySerializer(serializers.Serializer):
+    GROUP_FIELDS = ['month', 'status', 'tenure_band', 'amount_band']
+
+    month_from = serializers.DateField(input_formats=['%Y-%m'], required=False)
+    month_to = serializers.DateField(input_formats=['%Y-%m'], required=False)
+    status = serializers.ChoiceField(choices=Loan.STATUS_CHOICES, required=False)
+    group_by = serializers.CharField(required=False, default=','.join(GROUP_FIELDS))
+
+    def validate_group_by(self, value):
+        fields = [f.strip() for f in value.split(',') if f.strip()]
+        unknown = [f for f in fields if f not in self.GROUP_FIELDS]
+        if unknown:
+            raise serializers.ValidationError(f"Unknown fields {unknown}; choose from {self.GROUP_FIELDS}")
+        return fields
@@ -1,10 +1,19 @@
+import logging
+from datetime import timedelta
+
 from celery import shared_task
-import pandas as pd
+from . import archive, outbox
 from .models import Customer, Loan
-from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# pandas/openpyxl are imported inside the tasks so that Celery's task
+# autodiscovery does not pull them into every web and worker process.
 
 @shared_task
 def import_customers_from_excel(file_path):
+    import pandas as pd
+
     df = pd.read_excel(file_path)
     for _, row in df.iterrows():
         approved_limit = round(row['monthly_salary'] * 36 / 100000) * 100000  # nearest lakh
@@ -21,6 +30,8 @@ def import_customers_from_excel(file_path):
 
 @shared_task
 def import_loans_from_excel(file_path):
+    import pandas as pd
+
     df = pd.read_excel(file_path)
     for _, row in df.iterrows():
         customer = Customer.objects.get(id=row['customer id'])
@@ -36,3 +47,30 @@ def import_loans_from_excel(file_path):
                 'updated_at': pd.to_datetime(row['end date']),
             }
         )
+
+
+@shared_task
+def archive_closed_loans(batch_size=1000):
+    return archive.archive_closed_loans(batch_size=batch_size)
+
+
+@shared_task
+def relay_outbox_events(batch_size=500, max_batches=20):
+    """Drain the outbox in ordered batches and log the remaining lag."""
+    processed = 0
+    for _ in range(max_batches):
+        count = outbox.relay(batch_size=batch_size)
+        processed += count
+        if count < batch_size:
+            break
+    lag = outbox.outbox_lag()
+    logger.info(
+        'outbox relay processed=%d pending=%d failed=%d lag_seconds=%.1f',
+        processed, lag['pending'], lag['failed'], lag['lag_seconds'],
+    )
+    return {'processed': processed, **lag}
+
+
+@shared_task
+def purge_outbox_events(retention_hours=24):
+    return outbox.purge_processed(older_than=timedelta(hours=retention_hours))
@@ -1,6 +1,34 @@
-from django.test import TestCase
-from .models import Customer, Loan
-from .utils import calculate_credit_score
+import io
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from decimal import Decimal
+from unittest import mock, skipIf, skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from credit_system.db import discard_inherited_connections, pool_stats
+
+from .admin import EstimatedCountPaginator
+from .archive import add_months, archive_closed_loans
+from .models import ArchivedLoan, Customer, Loan, LoanRollup, OutboxEvent
+from .outbox import MAX_ATTEMPTS, outbox_lag, relay
+from .rollups import recompute
+from .throttling import acquire_slot, release_slot
+from .utils import cached_credit_score, calculate_credit_score, score_cache_enabled, score_cache_key
 
 
 class TestCalculateCreditScore(TestCase):
@@ -39,3 +67,691 @@ class TestCalculateCreditScore(TestCase):
 
 		score = calculate_credit_score(customer)
 		self.assertTrue(0 <= score <= 100)
+
+
+class TestLoanDecision(TestCase):
+	def setUp(self):
+		self.customer = Customer.objects.create(
+			first_name='Dave', last_name='Bulk', email='dave@example.com',
+			phone='4444444444', date_of_birth='1990-01-01'
+		)
+
+	def test_apply_decision_updates_queryset_in_one_query(self):
+		small = Loan.objects.create(customer=self.customer, amount=1000.0, term_months=12)
+		large = Loan.objects.create(customer=self.customer, amount=9000.0, term_months=12)
+		decided = Loan.objects.create(customer=self.customer, amount=100.0, term_months=12, status='REJECTED')
+
+		with self.assertNumQueries(1):
+			updated = Loan.objects.filter(status='PENDING').apply_decision()
+
+		self.assertEqual(updated, 2)
+		small.refresh_from_db()
+		large.refresh_from_db()
+		decided.refresh_from_db()
+		self.assertEqual(small.status, 'APPROVED')
+		self.assertEqual(large.status, 'REJECTED')
+		self.assertEqual(decided.status, 'REJECTED')
+
+	def test_decide_endpoint_filters_by_status(self):
+		Loan.objects.create(customer=self.customer, amount=1000.0, term_months=12)
+		Loan.objects.create(customer=self.customer, amount=9000.0, term_months=12, status='APPROVED')
+
+		client = APIClient()
+		response = client.post('/api/loans/decide/', {'status': 'PENDING'}, format='json')
+
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.data['updated'], 1)
+		self.assertEqual(Loan.objects.filter(status='APPROVED').count(), 2)
+
+	def test_decide_endpoint_works_in_bounded_batches(self):
+		other = Customer.objects.create(
+			first_name='Dan', last_name='Batch', email='dan@example.com',
+			phone='4444444445', date_of_birth='1990-01-01'
+		)
+		for amount, customer in ((1000, self.customer), (9000, other), (2000, self.customer), (3000, other), (8000, other)):
+			Loan.objects.create(customer=customer, amount=amount, term_months=12)
+
+		with mock.patch('loans.views.LoanViewSet.decide_batch_size', 2):
+			response = APIClient().post('/api/loans/decide/', {'status': 'PENDING'}, format='json')
+
+		self.assertEqual(response.data['updated'], 5)
+		self.assertFalse(Loan.objects.filter(status='PENDING').exists())
+		events = OutboxEvent.objects.filter(event_type='loans.decided').order_by('id')
+		self.assertEqual(
+			[sorted(e.payload['customer_ids']) for e in events],
+			[sorted([self.customer.id, other.id]), sorted([self.customer.id, other.id]), [other.id]],
+		)
+		self.assertEqual(OutboxEvent.objects.filter(event_type='rollups.adjusted').count(), 3)
+
+		response = APIClient().post('/api/loans/decide/', {'ids': list(range(10001))}, format='json')
+		self.assertEqual(response.status_code, 400)
+
+	def test_decide_endpoint_validates_filters_and_requires_a_scope(self):
+		Loan.objects.create(customer=self.customer, amount=1000.0, term_months=12)
+		client = APIClient()
+
+		for body in ({'ids': 'abc'}, {'ids': 5}, {'customer': 'x'}, {'status': 'LOST'}, {}, {'all': False}):
+			response = client.post('/api/loans/decide/', body, format='json')
+			self.assertEqual(response.status_code, 400, body)
+		self.assertEqual(Loan.objects.get().status, 'PENDING')
+
+		response = client.post('/api/loans/decide/', {'all': True}, format='json')
+		self.assertEqual(response.data['updated'], 1)
+		self.assertEqual(Loan.objects.get().status, 'APPROVED')
+
+	def test_create_decides_status_with_single_write(self):
+		client = APIClient()
+		with CaptureQueriesContext(connection) as ctx:
+			response = client.post('/api/loans/', {
+				'customer': self.customer.id, 'amount': '9000.00', 'term_months': 12,
+			}, format='json')
+
+		self.assertEqual(response.status_code, 201)
+		self.assertEqual(response.data['status'], 'REJECTED')
+		loan_writes = [q for q in ctx.captured_queries if q['sql'].startswith(('INSERT INTO "loans_loan"', 'UPDATE "loans_loan"'))]
+		self.assertEqual(len(loan_writes), 1)
+
+
+class TestStartupImports(SimpleTestCase):
+	def assert_not_imported(self, code, modules=('pandas', 'openpyxl')):
+		probe = code + "; import sys; print(','.join(m for m in %r if m in sys.modules))" % (modules,)
+		result = subprocess.run(
+			[sys.executable, '-c', probe], cwd=settings.BASE_DIR, capture_output=True, text=True,
+			env={**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE},
+		)
+		self.assertEqual(result.returncode, 0, result.stderr)
+		self.assertEqual(result.stdout.strip(), '')
+
+	def test_app_modules_do_not_import_pandas(self):
+		self.assert_not_imported(
+			"import django; django.setup(); import loans.views, loans.utils, loans.serializers, loans.urls"
+		)
+
+	def test_worker_task_discovery_does_not_import_pandas(self):
+		self.assert_not_imported(
+			"import django; django.setup(); from credit_system.celery import app; "
+			"app.loader.import_default_modules(); app.finalize()"
+		)
+
+
+@override_settings(ADMISSION_CONTROL={'CLIENT_RATE': 0.01, 'CLIENT_BURST': 2, 'MAX_IN_FLIGHT': 1})
+class TestAdmissionControl(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.customer = Customer.objects.create(
+			first_name='Erin', last_name='Busy', email='erin@example.com',
+			phone='5555555555', date_of_birth='1990-01-01'
+		)
+		self.payload = {'customer_id': self.customer.id, 'loan_amount': 1000, 'interest_rate': 10, 'tenure': 12}
+
+	def test_client_over_rate_gets_429_with_retry_after(self):
+		client = APIClient()
+		for _ in range(2):
+			self.assertEqual(client.post('/api/check-eligibility/', self.payload, format='json').status_code, 200)
+
+		response = client.post('/api/check-eligibility/', self.payload, format='json')
+		self.assertEqual(response.status_code, 429)
+		self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+	@override_settings(ADMISSION_CONTROL={'CLIENT_RATE': 0.01, 'CLIENT_BURST': 2, 'GLOBAL_RATE': 0.01, 'GLOBAL_BURST': 3})
+	def test_rejected_client_does_not_drain_global_bucket(self):
+		noisy = APIClient(REMOTE_ADDR='10.0.0.1')
+		statuses = [noisy.post('/api/check-eligibility/', self.payload, format='json').status_code for _ in range(10)]
+		self.assertEqual(statuses, [200, 200] + [429] * 8)
+
+		response = APIClient(REMOTE_ADDR='10.0.0.2').post('/api/check-eligibility/', self.payload, format='json')
+		self.assertEqual(response.status_code, 200)
+
+	@override_settings(ADMISSION_CONTROL={'CLIENT_RATE': 0.01, 'CLIENT_BURST': 1})
+	def test_rotating_forwarded_for_does_not_reset_client_bucket(self):
+		client = APIClient()
+		statuses = [
+			client.post('/api/check-eligibility/', self.payload, format='json', HTTP_X_FORWARDED_FOR=f'203.0.113.{i}').status_code
+			for i in range(3)
+		]
+		self.assertEqual(statuses, [200, 429, 429])
+
+	def test_in_flight_bound_sheds_with_503(self):
+		slot, token = acquire_slot('scoring')
+
+		response = APIClient().post('/api/check-eligibility/', self.payload, format='json')
+
+		self.assertEqual(response.status_code, 503)
+		self.assertIn('Retry-After', response)
+		self.assertEqual(cache.get(slot), token)
+
+		release_slot(slot, token)
+		self.assertEqual(APIClient().post('/api/check-eligibility/', self.payload, format='json').status_code, 200)
+
+	def test_leaked_in_flight_slot_expires_despite_traffic(self):
+		client = APIClient()
+		now = time.time()
+		with mock.patch('django.core.cache.backends.base.time') as base_clock, \
+				mock.patch('django.core.cache.backends.locmem.time') as locmem_clock:
+			def at(seconds):
+				base_clock.time.return_value = locmem_clock.time.return_value = now + seconds
+
+			# A worker killed mid-request never releases its slot.
+			at(0)
+			acquire_slot('scoring')
+			at(30)
+			self.assertEqual(client.post('/api/check-eligibility/', self.payload, format='json').status_code, 503)
+			at(61)
+			self.assertEqual(client.post('/api/check-eligibility/', self.payload, format='json').status_code, 200)
+
+
+class TestLoanArchive(TestCase):
+	def setUp(self):
+		self.customer = Customer.objects.create(
+			first_name='Fay', last_name='Archive', email='fay@example.com',
+			phone='6666666666', date_of_birth='1990-01-01', age=35, approved_limit=100000
+		)
+		self.now = timezone.now()
+		self.closed = self.make_loan(amount=2000, term_months=6, months_ago=7, status='APPROVED')
+		self.closed_rejected = self.make_loan(amount=900, term_months=12, months_ago=13, status='REJECTED')
+		self.active = self.make_loan(amount=3000, term_months=24, months_ago=7, status='APPROVED')
+
+	def make_loan(self, amount, term_months, months_ago, status):
+		loan = Loan.objects.create(customer=self.customer, amount=amount, term_months=term_months, status=status)
+		Loan.objects.filter(pk=loan.pk).update(created_at=add_months(self.now, -months_ago))
+		return loan
+
+	def test_archives_only_loans_whose_tenure_ended(self):
+		archived = archive_closed_loans(batch_size=1, now=self.now)
+
+		self.assertEqual(archived, 2)
+		self.assertEqual(list(Loan.objects.values_list('id', flat=True)), [self.active.id])
+		self.assertEqual(
+			sorted(ArchivedLoan.objects.values_list('id', flat=True)),
+			sorted([self.closed.id, self.closed_rejected.id]),
+		)
+
+	def test_score_is_unchanged_by_archiving(self):
+		before = calculate_credit_score(self.customer)
+		archive_closed_loans(now=self.now)
+		self.assertEqual(calculate_credit_score(self.customer), before)
+
+	def test_read_endpoints_include_archive_on_request(self):
+		archive_closed_loans(now=self.now)
+		client = APIClient()
+
+		self.assertEqual(client.get(f'/api/view-loan/{self.closed.id}/').status_code, 404)
+		response = client.get(f'/api/view-loan/{self.closed.id}/?include_archived=true')
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.data['id'], self.closed.id)
+
+		hot = client.get(f'/api/view-loans/{self.customer.id}/')
+		both = client.get(f'/api/view-loans/{self.customer.id}/?include_archived=true')
+		self.assertEqual(len(hot.data), 1)
+		self.assertEqual(len(both.data), 3)
+
+
+class TestAdminScale(TestCase):
+	def setUp(self):
+		admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+		self.client.force_login(admin_user)
+
+	def create_rows(self, start, count):
+		for i in range(start, start + count):
+			customer = Customer.objects.create(
+				first_name=f'First{i}', last_name=f'Last{i}', email=f'user{i}@example.com',
+				phone=f'90000{i:05d}', date_of_birth='1990-01-01'
+			)
+			Loan.objects.create(customer=customer, amount=1000, term_months=12)
+
+	def changelist_queries(self, url):
+		with CaptureQueriesContext(connection) as ctx:
+			response = self.client.get(url)
+		self.assertEqual(response.status_code, 200)
+		return len(ctx.captured_queries)
+
+	def test_changelist_query_count_is_constant(self):
+		for url in ('/admin/loans/loan/', '/admin/loans/loan/?status__exact=PENDING', '/admin/loans/customer/'):
+			self.create_rows(0, 2)
+			small = self.changelist_queries(url)
+			self.create_rows(2, 20)
+			large = self.changelist_queries(url)
+			self.assertEqual(small, large, url)
+			Customer.objects.all().delete()
+
+	def test_search_falls_back_to_exact_match(self):
+		self.create_rows(0, 3)
+		response = self.client.get('/admin/loans/customer/', {'q': 'user1@example.com'})
+		self.assertEqual([c.email for c in response.context['cl'].result_list], ['user1@example.com'])
+
+	@skipUnless(connection.vendor == 'postgresql', 'planner estimates are PostgreSQL-only')
+	def test_filtered_changelist_uses_planner_estimate(self):
+		self.create_rows(0, 30)
+		with connection.cursor() as cursor:
+			cursor.execute('ANALYZE loans_loan')
+
+		with mock.patch.object(EstimatedCountPaginator, 'exact_count_threshold', 0), \
+				CaptureQueriesContext(connection) as ctx:
+			response = self.client.get('/admin/loans/loan/', {'status__exact': 'PENDING'})
+
+		self.assertEqual(response.status_code, 200)
+		self.assertGreater(response.context['cl'].result_count, 0)
+		self.assertFalse([q for q in ctx.captured_queries if 'COUNT(' in q['sql'].upper()])
+
+
+class TestGenerateData(TestCase):
+	def generate_csv(self, out_dir, **options):
+		call_command(
+			'generate_data', customers=20, loans=100, seed=7, output='csv', out_dir=out_dir,
+			stdout=io.StringIO(), **options
+		)
+		with open(os.path.join(out_dir, 'customer_data.csv')) as customers, open(os.path.join(out_dir, 'loan_data.csv')) as loans:
+			return customers.read(), loans.read()
+
+	def test_files_are_deterministic_and_match_import_headers(self):
+		with tempfile.TemporaryDirectory() as first, tempfile.TemporaryDirectory() as second:
+			self.assertEqual(self.generate_csv(first), self.generate_csv(second))
+			customers, loans = self.generate_csv(first)
+
+		self.assertTrue(customers.startswith('Customer ID,First Name,Last Name,Age,Phone Number,Monthly Salary,Approved Limit'))
+		self.assertTrue(loans.startswith('Customer ID,Loan ID,Loan Amount,Tenure,Interest Rate,Monthly payment'))
+		self.assertEqual(len(loans.splitlines()), 101)
+
+	def test_db_output_keeps_generated_dates(self):
+		call_command(
+			'generate_data', customers=10, loans=50, seed=1, batch_size=7,
+			start_date=date(2012, 1, 1), end_date=date(2012, 12, 31), stdout=io.StringIO()
+		)
+
+		self.assertEqual(Customer.objects.count(), 10)
+		self.assertEqual(Loan.objects.count(), 50)
+		self.assertFalse(Loan.objects.exclude(created_at__year=2012).exists())
+		customer = Customer.objects.first()
+		self.assertEqual(customer.date_of_birth, date(2012 - customer.age, 1, 1))
+		self.assertEqual(customer.created_at.date(), date(2012, 12, 31))
+
+	def test_default_end_date_does_not_depend_on_today(self):
+		with tempfile.TemporaryDirectory() as out_dir:
+			expected = self.generate_csv(out_dir)
+			with mock.patch('loans.management.commands.generate_data.date', wraps=date) as fake_date:
+				fake_date.today.return_value = date(2040, 6, 1)
+				self.assertEqual(self.generate_csv(out_dir), expected)
+
+
+@override_settings(ADMISSION_CONTROL={'CLIENT_BURST': 1000, 'GLOBAL_BURST': 1000})
+class TestPricingGrid(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.customer = Customer.objects.create(
+			first_name='Gus', last_name='Grid', email='gus@example.com',
+			phone='7777777777', date_of_birth='1990-01-01', approved_limit=500000
+		)
+		Loan.objects.create(customer=self.customer, amount=100000, term_months=12, status='APPROVED')
+
+	def test_grid_matches_single_eligibility_checks(self):
+		client = APIClient()
+		response = client.post('/api/pricing-grid/', {
+			'customer_id': self.customer.id,
+			'loan_amount': {'min': 10000, 'max': 200000, 'steps': 4},
+			'tenure': {'min': 6, 'max': 36, 'steps': 3},
+			'interest_rate': {'min': 0, 'max': 14, 'steps': 3},
+		}, format='json')
+		self.assertEqual(response.status_code, 200)
+		grid = response.data
+		self.assertEqual(grid['tenures'], [6, 21, 36])
+
+		for i, amount in enumerate(grid['loan_amounts']):
+			for j, tenure in enumerate(grid['tenures']):
+				for k, rate in enumerate(grid['interest_rates']):
+					single = client.post('/api/check-eligibility/', {
+						'customer_id': self.customer.id, 'loan_amount': amount, 'interest_rate': rate, 'tenure': tenure,
+					}, format='json').data
+					self.assertEqual(grid['approval'], single['approval'])
+					self.assertEqual(grid['corrected_interest_rates'][k], single['corrected_interest_rate'])
+					self.assertAlmostEqual(grid['monthly_installment'][i][j][k], single['monthly_installment'], delta=0.01)
+
+	def test_rejects_inverted_range(self):
+		response = APIClient().post('/api/pricing-grid/', {
+			'customer_id': self.customer.id,
+			'loan_amount': {'min': 5000, 'max': 1000},
+			'tenure': {'min': 12, 'max': 12},
+			'interest_rate': {'min': 10, 'max': 10},
+		}, format='json')
+		self.assertEqual(response.status_code, 400)
+		self.assertIn('loan_amount', response.data)
+
+	def test_rejects_oversized_grid_and_out_of_range_terms(self):
+		client = APIClient()
+		base = {
+			'customer_id': self.customer.id,
+			'loan_amount': {'min': 1000, 'max': 5000, 'steps': 100},
+			'tenure': {'min': 6, 'max': 60, 'steps': 100},
+			'interest_rate': {'min': 1, 'max': 20, 'steps': 100},
+		}
+		response = client.post('/api/pricing-grid/', base, format='json')
+		self.assertEqual(response.status_code, 400)
+		self.assertIn('non_field_errors', response.data)
+
+		for field, bounds in (('tenure', {'min': 6, 'max': 1e9}), ('interest_rate', {'min': -5, 'max': 10})):
+			response = client.post('/api/pricing-grid/', {**base, 'loan_amount': {'min': 1000, 'max': 1000}, field: bounds}, format='json')
+			self.assertEqual(response.status_code, 400)
+			self.assertIn(field, response.data)
+
+		response = client.post('/api/check-eligibility/', {
+			'customer_id': self.customer.id, 'loan_amount': 1000, 'interest_rate': -1, 'tenure': 10 ** 6,
+		}, format='json')
+		self.assertEqual(response.status_code, 400)
+		self.assertEqual(set(response.data), {'interest_rate', 'tenure'})
+
+
+class TestOutbox(TestCase):
+	def setUp(self):
+		cache.clear()
+		# The tests' locmem cache stands in for Redis here.
+		patcher = mock.patch('loans.utils.score_cache_enabled', return_value=True)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+		self.customer = Customer.objects.create(
+			first_name='Hal', last_name='Outbox', email='hal@example.com',
+			phone='8888888888', date_of_birth='1990-01-01', approved_limit=100000
+		)
+		self.client = APIClient()
+
+	def test_loan_writes_record_events_in_the_same_transaction(self):
+		response = self.client.post('/api/loans/', {
+			'customer': self.customer.id, 'amount': '1000.00', 'term_months': 12,
+		}, format='json')
+		loan_id = response.data['id']
+		self.client.patch(f'/api/loans/{loan_id}/', {'amount': '9000.00'}, format='json')
+		self.client.delete(f'/api/loans/{loan_id}/')
+
+		events = list(OutboxEvent.objects.order_by('id'))
+		self.assertEqual([e.event_type for e in events], ['loan.created', 'loan.updated', 'loan.deleted'])
+		self.assertEqual(events[1].payload['previous']['status'], 'APPROVED')
+		self.assertEqual(events[1].payload['loan']['status'], 'REJECTED')
+		self.assertTrue(all(e.customer_id == self.customer.id for e in events))
+
+	def test_relay_refreshes_score_cache_and_clears_lag(self):
+		self.client.post('/api/loans/', {
+			'customer': self.customer.id, 'amount': '1000.00', 'term_months': 12,
+		}, format='json')
+		self.assertEqual(outbox_lag()['pending'], 1)
+
+		self.assertEqual(relay(), 1)
+
+		self.assertEqual(cache.get(score_cache_key(self.customer.id)), calculate_credit_score(self.customer))
+		self.assertEqual(outbox_lag(), {'pending': 0, 'failed': 0, 'lag_seconds': 0.0})
+		self.assertEqual(relay(), 0)
+
+	def test_failed_event_holds_back_only_its_customer(self):
+		other = Customer.objects.create(
+			first_name='Ivy', last_name='Outbox', email='ivy@example.com',
+			phone='8888888889', date_of_birth='1990-01-01', approved_limit=100000
+		)
+		failing = OutboxEvent.objects.create(event_type='test.event', customer_id=self.customer.id)
+		held = OutboxEvent.objects.create(event_type='test.event', customer_id=self.customer.id)
+		unrelated = OutboxEvent.objects.create(event_type='test.event', customer_id=other.id)
+		seen = []
+
+		def handler(event):
+			if event.id == failing.id and event.attempts == 0:
+				raise RuntimeError('boom')
+			seen.append(event.id)
+
+		with mock.patch.dict('loans.outbox.EVENT_HANDLERS', {'test.event': [handler]}):
+			with self.assertLogs('loans.outbox', 'ERROR'):
+				self.assertEqual(relay(), 1)
+			self.assertEqual(seen, [unrelated.id])
+			self.assertEqual(relay(), 2)
+		self.assertEqual(seen, [unrelated.id, failing.id, held.id])
+
+	def test_event_is_parked_after_max_attempts(self):
+		poison = OutboxEvent.objects.create(event_type='test.poison', customer_id=self.customer.id)
+		later = OutboxEvent.objects.create(event_type='test.event', customer_id=self.customer.id)
+
+		def fail(event):
+			raise RuntimeError('boom')
+
+		handlers = {'test.poison': [fail], 'test.event': [lambda event: None]}
+		with mock.patch.dict('loans.outbox.EVENT_HANDLERS', handlers):
+			with self.assertLogs('loans.outbox', 'ERROR') as logs:
+				for _ in range(MAX_ATTEMPTS - 1):
+					self.assertEqual(relay(), 0)
+				self.assertEqual(relay(), 1)
+		self.assertIn('parked', logs.output[-1])
+
+		poison.refresh_from_db()
+		later.refresh_from_db()
+		self.assertEqual(poison.attempts, MAX_ATTEMPTS)
+		self.assertIsNotNone(poison.failed_at)
+		self.assertIsNotNone(later.processed_at)
+		self.assertEqual(outbox_lag()['failed'], 1)
+		self.assertEqual(relay(), 0)
+
+	def test_process_local_cache_is_bypassed(self):
+		cache.set(score_cache_key(self.customer.id), -1)
+		self.client.post('/api/loans/', {
+			'customer': self.customer.id, 'amount': '1000.00', 'term_months': 12,
+		}, format='json')
+
+		with mock.patch('loans.utils.score_cache_enabled', return_value=False):
+			self.assertEqual(cached_credit_score(self.customer), calculate_credit_score(self.customer))
+			self.assertEqual(relay(), 1)
+		self.assertEqual(cache.get(score_cache_key(self.customer.id)), -1)
+		self.assertFalse(score_cache_enabled())
+
+	def test_moving_a_loan_refreshes_both_customers_scores(self):
+		other = Customer.objects.create(
+			first_name='Ivy', last_name='Outbox', email='ivy@example.com',
+			phone='8888888889', date_of_birth='1990-01-01', approved_limit=100000
+		)
+		loan = Loan.objects.create(customer=self.customer, amount=1000, term_months=12, status='APPROVED')
+		cache.set(score_cache_key(self.customer.id), -1)
+
+		self.client.patch(f'/api/loans/{loan.id}/', {'customer': other.id}, format='json')
+		relay()
+
+		self.assertEqual(cache.get(score_cache_key(self.customer.id)), calculate_credit_score(self.customer))
+		self.assertEqual(cache.get(score_cache_key(other.id)), calculate_credit_score(other))
+
+
+class TestDatabaseConnections(SimpleTestCase):
+	@skipIf(connection.settings_dict['OPTIONS'].get('pool'), 'DB_POOL=true')
+	def test_unpooled_backend_reports_not_pooled(self):
+		self.assertEqual(pool_stats(), {'default': {'pooled': False}})
+
+	def test_inherited_connections_and_pools_are_discarded_without_closing(self):
+		raw_connection, pool = mock.Mock(), mock.Mock()
+		conn = mock.Mock(alias='default', connection=raw_connection, _connection_pools={'default': pool})
+
+		with mock.patch('credit_system.db.connections') as conns:
+			conns.all.return_value = [conn]
+			discard_inherited_connections()
+
+		self.assertIsNone(conn.connection)
+		self.assertEqual(conn._connection_pools, {})
+		raw_connection.close.assert_not_called()
+		pool.close.assert_not_called()
+
+
+class TestBulkRegistration(TestCase):
+	def setUp(self):
+		Customer.objects.create(
+			first_name='Ivy', last_name='Existing', email='ivy@example.com',
+			phone='9000000001', date_of_birth='1990-01-01'
+		)
+		self.client = APIClient()
+
+	def row(self, i, **overrides):
+		return {'first_name': 'New', 'last_name': f'Customer{i}', 'phone': f'80000000{i:02d}',
+				'monthly_income': 50000, 'age': 30, **overrides}
+
+	def test_creates_batch_with_constant_queries(self):
+		rows = [self.row(i) for i in range(25)]
+		with CaptureQueriesContext(connection) as ctx:
+			response = self.client.post('/api/register/bulk/', rows, format='json')
+
+		self.assertEqual(response.status_code, 201)
+		self.assertEqual(len(response.data), 25)
+		self.assertEqual(response.data[0]['approved_limit'], '1800000.00')
+		self.assertEqual(Customer.objects.count(), 26)
+		self.assertLessEqual(len(ctx.captured_queries), 8)
+		self.assertEqual(OutboxEvent.objects.filter(event_type='customer.created').count(), 25)
+
+	def test_reports_duplicates_by_index_and_inserts_nothing(self):
+		rows = [
+			self.row(0),
+			self.row(1, phone='9000000001'),
+			self.row(2, phone=self.row(0)['phone']),
+			self.row(3, email='ivy@example.com'),
+			self.row(4, monthly_income='lots'),
+		]
+		response = self.client.post('/api/register/bulk/', {'customers': rows}, format='json')
+
+		self.assertEqual(response.status_code, 400)
+		errors = response.data['errors']
+		self.assertEqual(sorted(errors), [1, 2, 3, 4])
+		self.assertIn('already exists', str(errors[1]['phone']))
+		self.assertIn('row 0', str(errors[2]['phone']))
+		self.assertIn('already exists', str(errors[3]['email']))
+		self.assertIn('monthly_income', errors[4])
+		self.assertEqual(Customer.objects.count(), 1)
+
+	def test_single_registration_derives_limit_and_dob(self):
+		response = self.client.post('/api/register/', self.row(9), format='json')
+
+		self.assertEqual(response.status_code, 201)
+		customer = Customer.objects.get(id=response.data['id'])
+		self.assertEqual(customer.approved_limit, 1800000)
+		self.assertEqual(customer.date_of_birth.year, date.today().year - 30)
+
+	def test_rejects_out_of_range_age_and_income(self):
+		for overrides in ({'age': 5000}, {'age': 5}, {'monthly_income': 10 ** 9}, {'monthly_income': -1}):
+			response = self.client.post('/api/register/', self.row(9, **overrides), format='json')
+			self.assertEqual(response.status_code, 400)
+			self.assertEqual(set(response.data), set(overrides))
+
+		response = self.client.post('/api/register/bulk/', [self.row(0), self.row(1, age=5000)], format='json')
+		self.assertEqual(response.status_code, 400)
+		self.assertEqual(list(response.data['errors']), [1])
+		self.assertEqual(Customer.objects.count(), 1)
+
+
+@override_settings(ADMISSION_CONTROL={'CLIENT_BURST': 1000, 'GLOBAL_BURST': 1000})
+class TestPortfolioRollups(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.client = APIClient()
+		self.customers = [
+			Customer.objects.create(
+				first_name='Jo', last_name=f'Rollup{i}', email=f'jo{i}@example.com',
+				phone=f'60000000{i:02d}', date_of_birth='1990-01-01', approved_limit=10 ** 8
+			)
+			for i in range(3)
+		]
+
+	def rollup_table(self):
+		return {
+			(r.month, r.status, r.tenure_band, r.amount_band): [r.loan_count, r.amount_sum]
+			for r in LoanRollup.objects.all() if r.loan_count or r.amount_sum
+		}
+
+	def drain(self):
+		while relay():
+			pass
+
+	def test_incremental_rollups_match_full_recompute(self):
+		self.admin = Client()
+		self.admin.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+		rng = random.Random(42)
+		amounts = ['900.00', '4000.00', '150000.00', '700000.00', '2500000.00']
+		for step in range(60):
+			loan_ids = list(Loan.objects.values_list('id', flat=True))
+			action = rng.choice([
+				'create', 'create', 'create_loan', 'update', 'decide', 'delete', 'admin_update', 'admin_delete',
+			])
+			customer = rng.choice(self.customers)
+			if action == 'create' or not loan_ids:
+				self.client.post('/api/loans/', {
+					'customer': customer.id, 'amount': rng.choice(amounts), 'term_months': rng.choice([6, 18, 36, 120]),
+				}, format='json')
+			elif action == 'create_loan':
+				self.client.post('/api/create-loan/', {
+					'customer_id': customer.id, 'loan_amount': float(rng.choice(amounts)),
+					'interest_rate': 10, 'tenure': rng.choice([12, 24, 72]),
+				}, format='json')
+			elif action == 'update':
+				self.client.patch(f'/api/loans/{rng.choice(loan_ids)}/', {
+					'amount': rng.choice(amounts), 'term_months': rng.choice([6, 18, 36, 120]),
+				}, format='json')
+			elif action == 'admin_update':
+				response = self.admin.post(f'/admin/loans/loan/{rng.choice(loan_ids)}/change/', {
+					'customer': customer.id, 'amount': rng.choice(amounts), 'term_months': rng.choice([6, 18, 36, 120]),
+					'status': rng.choice(['PENDING', 'APPROVED', 'REJECTED']),
+				})
+				self.assertEqual(response.status_code, 302)
+			elif action == 'admin_delete':
+				response = self.admin.post('/admin/loans/loan/', {
+					'action': 'delete_selected', 'post': 'yes', '_selected_action': rng.sample(loan_ids, min(2, len(loan_ids))),
+				})
+				self.assertEqual(response.status_code, 302)
+			elif action == 'decide':
+				self.client.post('/api/loans/decide/', {'customer': customer.id}, format='json')
+			else:
+				self.client.delete(f'/api/loans/{rng.choice(loan_ids)}/')
+			if step % 7 == 0:
+				self.drain()
+
+		self.drain()
+		expected = {key: list(value) for key, value in recompute().items()}
+		self.assertTrue(expected)
+		self.assertEqual(self.rollup_table(), expected)
+
+		# Deleting a customer cascades its loans; the rollups follow.
+		self.client.delete(f'/api/customers/{self.customers[0].id}/')
+		self.admin.post(f'/admin/loans/customer/{self.customers[1].id}/delete/', {'post': 'yes'})
+		self.drain()
+		self.assertFalse(Customer.objects.filter(id__in=[self.customers[0].id, self.customers[1].id]).exists())
+		self.assertEqual(self.rollup_table(), {key: list(value) for key, value in recompute().items()})
+
+	def test_rollup_inputs_are_read_under_row_locks(self):
+		loan = Loan.objects.create(customer=self.customers[0], amount=1000, term_months=12, status='APPROVED')
+		locked = []
+		select_for_update = QuerySet.select_for_update
+
+		def record(queryset, *args, **kwargs):
+			locked.append(queryset.model)
+			return select_for_update(queryset, *args, **kwargs)
+
+		with mock.patch.object(QuerySet, 'select_for_update', autospec=True, side_effect=record):
+			self.client.patch(f'/api/loans/{loan.id}/', {'amount': '9000.00'}, format='json')
+			self.assertEqual(locked, [Loan])
+			self.client.post('/api/loans/decide/', {'customer': self.customers[0].id}, format='json')
+			# One batch, then the empty lookup that ends the loop
+			self.assertEqual(locked, [Loan, Loan, Loan])
+			self.client.delete(f'/api/customers/{self.customers[0].id}/')
+			self.assertEqual(locked, [Loan, Loan, Loan, Customer, Loan, ArchivedLoan])
+
+	def test_rebuild_command_and_analytics_endpoint(self):
+		for amount in ('1000.00', '200000.00', '3000.00'):
+			self.client.post('/api/loans/', {'customer': self.customers[0].id, 'amount': amount, 'term_months': 12}, format='json')
+		LoanRollup.objects.all().delete()
+		OutboxEvent.objects.all().delete()
+
+		call_command('rebuild_rollups', stdout=io.StringIO())
+
+		response = self.client.get('/api/analytics/portfolio/', {'group_by': 'status'})
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(
+			[(row['status'], row['loan_count'], row['amount_sum']) for row in response.data['rows']],
+			[('APPROVED', 2, Decimal('4000.00')), ('REJECTED', 1, Decimal('200000.00'))],
+		)
+		self.assertEqual(self.client.get('/api/analytics/portfolio/', {'group_by': 'colour'}).status_code, 400)
+
+	def test_rebuild_refuses_while_loan_events_are_held_back(self):
+		customer = self.customers[0]
+		OutboxEvent.objects.create(event_type='test.failing', customer_id=customer.id)
+		self.client.post('/api/loans/', {'customer': customer.id, 'amount': '1000.00', 'term_months': 12}, format='json')
+
+		def fail(event):
+			raise RuntimeError('boom')
+
+		with mock.patch.dict('loans.outbox.EVENT_HANDLERS', {'test.failing': [fail]}):
+			with self.assertLogs('loans.outbox', 'ERROR'), self.assertRaises(CommandError):
+				call_command('rebuild_rollups', stdout=io.StringIO())
+		self.assertFalse(LoanRollup.objects.exists())
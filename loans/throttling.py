@@ -0,0 +1,179 @@
+"""Admission control for the scoring endpoints.
+
+Two layers, both backed by the Django cache so every web process shares the
+same counters:
+
+- token-bucket rate limits, per client and global, rejected with 429;
+- an in-flight bound on scoring work, rejected with 503.
+
+Both responses carry a ``Retry-After`` header.
+"""
+import math
+import random
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import exceptions, status
+from rest_framework.throttling import BaseThrottle
+
+
+DEFAULTS = {
+    'CLIENT_RATE': 10.0,      # tokens per second, per client
+    'CLIENT_BURST': 20,       # bucket size, per client
+    'GLOBAL_RATE': 200.0,     # tokens per second, all clients
+    'GLOBAL_BURST': 400,      # bucket size, all clients
+    'MAX_IN_FLIGHT': 32,      # concurrent scoring requests across processes
+    'IN_FLIGHT_TTL': 60,      # seconds before a leaked in-flight count expires
+    'BUSY_RETRY_AFTER': 1,    # Retry-After seconds sent with 503
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'ADMISSION_CONTROL', {}).get(name, DEFAULTS[name])
+
+
+class ServiceBusy(exceptions.APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many scoring requests in progress, try again later.'
+    default_code = 'service_busy'
+
+    def __init__(self, wait, detail=None, code=None):
+        # DRF's exception handler turns `wait` into a Retry-After header.
+        self.wait = wait
+        super().__init__(detail, code)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Token bucket stored in the cache as ``(tokens, last_refill_time)``.
+
+    Reads and writes are not atomic across processes, so concurrent requests
+    can occasionally spend the same token; that is an acceptable error for
+    load shedding and keeps the check to one cache round trip each way.
+    """
+    scope = 'scoring'
+    rate_setting = None
+    burst_setting = None
+    timer = time.time
+
+    def get_cache_key(self, request, view):
+        raise NotImplementedError('.get_cache_key() must be overridden')
+
+    def allow_request(self, request, view):
+        rate = float(get_setting(self.rate_setting))
+        burst = float(get_setting(self.burst_setting))
+        key = self.get_cache_key(request, view)
+        now = self.timer()
+
+        tokens, last = cache.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - last) * rate)
+        # Keep the bucket around for as long as it takes to refill completely.
+        timeout = math.ceil(burst / rate) + 1
+
+        if tokens < 1:
+            self.wait_seconds = (1 - tokens) / rate
+            cache.set(key, (tokens, now), timeout)
+            return False
+
+        self.wait_seconds = None
+        cache.set(key, (tokens - 1, now), timeout)
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class ClientTokenBucketThrottle(TokenBucketThrottle):
+    rate_setting = 'CLIENT_RATE'
+    burst_setting = 'CLIENT_BURST'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f'user-{request.user.pk}'
+        else:
+            ident = self.get_ident(request)
+        return f'throttle:{self.scope}:client:{ident}'
+
+
+class GlobalTokenBucketThrottle(TokenBucketThrottle):
+    rate_setting = 'GLOBAL_RATE'
+    burst_setting = 'GLOBAL_BURST'
+
+    def get_cache_key(self, request, view):
+        return f'throttle:{self.scope}:global'
+
+
+class ScoringThrottle(BaseThrottle):
+    """Per-client bucket first, then the global one.
+
+    DRF calls ``allow_request`` on every throttle in ``throttle_classes``, so
+    listing the two buckets separately would charge the global bucket for
+    requests the client bucket already rejected, letting one client drain it
+    for everyone. Chaining them here only spends a global token on requests
+    the client's own limit admits.
+    """
+    bucket_classes = (ClientTokenBucketThrottle, GlobalTokenBucketThrottle)
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        for bucket_class in self.bucket_classes:
+            bucket = bucket_class()
+            if not bucket.allow_request(request, view):
+                self.wait_seconds = bucket.wait()
+                return False
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+SCORING_THROTTLES = [ScoringThrottle]
+
+
+def limit_concurrency(view_func, scope='scoring'):
+    """Reject with 503 once more than MAX_IN_FLIGHT requests are being handled.
+
+    Goes under ``@api_view`` so that the rate limits are checked first and
+    rejected requests never count towards the in-flight total.
+
+    Each request holds one of MAX_IN_FLIGHT slot keys, taken with
+    ``cache.add`` and expiring after IN_FLIGHT_TTL on its own. A worker killed
+    mid-request therefore leaks a single slot for at most IN_FLIGHT_TTL,
+    rather than a shared counter that never comes back down while traffic
+    keeps arriving.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        slot, token = acquire_slot(scope)
+        if slot is None:
+            raise ServiceBusy(wait=get_setting('BUSY_RETRY_AFTER'))
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            release_slot(slot, token)
+
+    return wrapper
+
+
+def slot_keys(scope):
+    return [f'inflight:{scope}:{i}' for i in range(get_setting('MAX_IN_FLIGHT'))]
+
+
+def acquire_slot(scope):
+    """Take a free in-flight slot; returns ``(key, token)`` or ``(None, None)``."""
+    keys = slot_keys(scope)
+    taken = cache.get_many(keys)
+    token = uuid.uuid4().hex
+    # Random order so concurrent requests rarely race for the same free slot.
+    for key in random.sample(keys, len(keys)):
+        if key not in taken and cache.add(key, token, get_setting('IN_FLIGHT_TTL')):
+            return key, token
+    return None, None
+
+
+def release_slot(key, token):
+    # The slot may have expired and been taken by another request meanwhile.
+    if cache.get(key) == token:
+        cache.delete(key)
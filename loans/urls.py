@@ -4,10 +4,14 @@ from .views import (
     CustomerViewSet,
     LoanViewSet,
     register_customer,
+    register_customers_bulk,
     check_eligibility,
+    pricing_grid,
     create_loan,
     view_loan,
     view_loans_by_customer,
+    db_pool_status,
+    portfolio_analytics,
 )
 
 router = routers.DefaultRouter()
@@ -17,10 +21,14 @@ router.register(r'loans', LoanViewSet, basename='loan')
 # Single combined urlpatterns: function-based API endpoints plus router-generated ViewSet routes
 urlpatterns = [
     path('register/', register_customer, name='register_customer'),
+    path('register/bulk/', register_customers_bulk, name='register_customers_bulk'),
     path('check-eligibility/', check_eligibility, name='check_eligibility'),
+    path('pricing-grid/', pricing_grid, name='pricing_grid'),
     path('create-loan/', create_loan, name='create_loan'),
     path('view-loan/<int:loan_id>/', view_loan, name='view_loan'),
     path('view-loans/<int:customer_id>/', view_loans_by_customer, name='view_loans_by_customer'),
+    path('analytics/portfolio/', portfolio_analytics, name='portfolio_analytics'),
+    path('health/db-pool/', db_pool_status, name='db_pool_status'),
 ]
 
 # Extend with router URLs (customers/ and loans/)
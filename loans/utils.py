@@ -1,5 +1,8 @@
 from datetime import datetime
-from .models import Customer, Loan
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from .models import ArchivedLoan, Customer, Loan
 
 
 def calculate_credit_score(customer):
@@ -10,29 +13,42 @@ def calculate_credit_score(customer):
     - 20% recent loan activity (more recent loans slightly reduces score)
     - 40% total loan amount relative to approved limit
 
+    Archived loans (see loans/archive.py) are included through one aggregate
+    query so that archiving never changes a score.
+
     Returns int score between 0 and 100. If current approved debt exceeds
     customer's approved_limit, return 0.
     """
+    current_year = datetime.utcnow().year
+    archived = ArchivedLoan.objects.filter(customer=customer).aggregate(
+        count=Count('id'),
+        current_year=Count('id', filter=Q(created_at__year=current_year)),
+        total_amount=Sum('amount'),
+        approved_amount=Sum('amount', filter=Q(status='APPROVED')),
+    )
+
     loans = Loan.objects.filter(customer=customer)
-    total_loans = loans.count()
+    total_loans = loans.count() + archived['count']
     if total_loans == 0:
         return 100  # No past loans, assume perfect score
 
-    # on-time payments ratio (default True if attribute missing)
-    on_time_ratio = sum(1 for l in loans if getattr(l, 'emis_paid_on_time', True)) / total_loans
+    # on-time payments ratio (default True if attribute missing; archived
+    # loans carry no payment history and count as on time)
+    on_time = sum(1 for l in loans if getattr(l, 'emis_paid_on_time', True)) + archived['count']
+    on_time_ratio = on_time / total_loans
 
     # number of loans in current year (use current UTC year)
-    current_year = datetime.utcnow().year
     current_year_loans = sum(1 for l in loans if getattr(l, 'created_at', None) and l.created_at.year == current_year)
+    current_year_loans += archived['current_year']
 
     # total loan amount and current approved debt
     try:
-        total_loan_amount = sum(float(l.amount) for l in loans)
+        total_loan_amount = sum(float(l.amount) for l in loans) + float(archived['total_amount'] or 0)
     except Exception:
         total_loan_amount = 0.0
 
     try:
-        current_debt = sum(float(l.amount) for l in loans if l.status == 'APPROVED')
+        current_debt = sum(float(l.amount) for l in loans if l.status == 'APPROVED') + float(archived['approved_amount'] or 0)
     except Exception:
         current_debt = 0.0
 
@@ -56,6 +72,63 @@ def calculate_credit_score(customer):
     return max(0, min(score, 100))
 
 
+def calculate_approved_limit(monthly_income):
+    """approved_limit = 36 * monthly_income, rounded to the nearest lakh."""
+    return round(float(monthly_income) * 36 / 100000) * 100000
+
+
+SCORE_CACHE_TIMEOUT = 60 * 60
+
+# Backends whose entries live in a single process. The relay refreshes scores
+# from the Celery worker, so with these the web processes would never see the
+# refresh and would serve scores up to SCORE_CACHE_TIMEOUT old.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def score_cache_enabled():
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+def score_cache_key(customer_id):
+    return f'credit-score:{customer_id}'
+
+
+def cached_credit_score(customer):
+    """calculate_credit_score, served from the cache when possible.
+
+    The outbox relay (loans/outbox.py) refreshes the entry after each loan or
+    customer write, so it can trail writes by one relay interval. Use it for
+    advisory reads such as eligibility checks; loan creation scores fresh.
+    Without a shared cache (``CACHE_URL`` unset) every call scores fresh.
+    """
+    if not score_cache_enabled():
+        return calculate_credit_score(customer)
+    key = score_cache_key(customer.id)
+    score = cache.get(key)
+    if score is None:
+        score = calculate_credit_score(customer)
+        cache.set(key, score, SCORE_CACHE_TIMEOUT)
+    return score
+
+
+def refresh_cached_credit_score(customer_id):
+    if not score_cache_enabled():
+        return
+    customer = Customer.objects.filter(id=customer_id).first()
+    if customer is None:
+        cache.delete(score_cache_key(customer_id))
+    else:
+        cache.set(score_cache_key(customer_id), calculate_credit_score(customer), SCORE_CACHE_TIMEOUT)
+
+
+def invalidate_cached_credit_scores(customer_ids):
+    if score_cache_enabled():
+        cache.delete_many([score_cache_key(customer_id) for customer_id in customer_ids])
+
+
 def get_corrected_interest(score, interest_rate):
     """Return (approval: bool, corrected_interest_rate: float).
 
@@ -1,55 +1,183 @@
-from django.shortcuts import render
-
-# Create your views here.
-from rest_framework import viewsets
-from .models import Customer, Loan
-from .serializers import CustomerSerializer, LoanSerializer
-
-from rest_framework.decorators import api_view
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from rest_framework import status, viewsets
+from rest_framework.decorators import action, api_view, throttle_classes
 from rest_framework.response import Response
-from rest_framework import status
-from .serializers import LoanEligibilitySerializer, LoanEligibilityResponseSerializer
-from .models import Customer
-from .utils import calculate_credit_score, get_corrected_interest, calculate_emi
-from .models import Loan
-from .utils import calculate_credit_score, get_corrected_interest, calculate_emi
-
 
-class CustomerViewSet(viewsets.ModelViewSet):
+from credit_system.db import pool_stats
+
+from . import outbox, registration, rollups
+from .models import ArchivedLoan, Customer, Loan, LoanRollup
+from .serializers import (
+    CustomerSerializer,
+    LoanSerializer,
+    CustomerRegisterSerializer,
+    LoanEligibilitySerializer,
+    PricingGridSerializer,
+    LoanCreateSerializer,
+    LoanDetailSerializer,
+    ArchivedLoanDetailSerializer,
+    PortfolioAnalyticsQuerySerializer,
+    LoanDecisionFilterSerializer,
+)
+from .throttling import SCORING_THROTTLES, limit_concurrency
+from .utils import calculate_credit_score, cached_credit_score, get_corrected_interest, calculate_emi
+
+
+class LockOnWriteMixin:
+    """Fetch the object with SELECT ... FOR UPDATE for updates and deletes.
+
+    ``perform_update``/``perform_destroy`` read the current row to build
+    outbox events and rollup deltas, so the row is locked, inside the same
+    transaction as the write, before that read.
+    """
+    lock_methods = ('PUT', 'PATCH', 'DELETE')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method in self.lock_methods:
+            queryset = queryset.select_for_update()
+        return queryset
+
+    @transaction.atomic
+    def update(self, request, *args, **kwargs):
+        return super().update(request, *args, **kwargs)
+
+    @transaction.atomic
+    def destroy(self, request, *args, **kwargs):
+        return super().destroy(request, *args, **kwargs)
+
+
+class CustomerViewSet(LockOnWriteMixin, viewsets.ModelViewSet):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
 
-class LoanViewSet(viewsets.ModelViewSet):
+    @transaction.atomic
+    def perform_create(self, serializer):
+        customer = serializer.save()
+        outbox.record_customer_event('customer.created', customer)
+
+    def perform_update(self, serializer):
+        customer = serializer.save()
+        outbox.record_customer_event('customer.updated', customer)
+
+    def perform_destroy(self, instance):
+        outbox.record_customer_event('customer.deleted', instance)
+        # The customer's loans go with it (CASCADE), without per-loan events
+        rollups.record_rollup_delta(rollups.customer_removal_delta([instance.pk]))
+        instance.delete()
+
+class LoanViewSet(LockOnWriteMixin, viewsets.ModelViewSet):
     queryset = Loan.objects.all()
     serializer_class = LoanSerializer
     filterset_fields = ['status', 'customer']  # Filter by status or customer
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        loan = serializer.save()
-        loan.approve_or_reject()  # Auto approve/reject on creation
+        # Auto approve/reject on creation, decided before the single INSERT
+        amount = serializer.validated_data['amount']
+        loan = serializer.save(status=Loan.decide_status(amount))
+        outbox.record_loan_event('loan.created', loan)
 
     def perform_update(self, serializer):
-        loan = serializer.save()
-        loan.approve_or_reject()  # Auto approve/reject on update
-
-from rest_framework.decorators import api_view
-from rest_framework.response import Response
-from rest_framework import status
-from .serializers import CustomerRegisterSerializer
+        # Auto approve/reject on update, decided before the single UPDATE
+        previous = outbox.loan_snapshot(serializer.instance)
+        amount = serializer.validated_data.get('amount', serializer.instance.amount)
+        loan = serializer.save(status=Loan.decide_status(amount))
+        outbox.record_loan_event('loan.updated', loan, previous=previous)
+
+    def perform_destroy(self, instance):
+        outbox.record_loan_event('loan.deleted', instance)
+        instance.delete()
+
+    # Loans re-decided per transaction; bounds the lock set and every IN list
+    decide_batch_size = 5000
+
+    @action(detail=False, methods=['post'])
+    def decide(self, request):
+        """Re-run the approval rule over a filtered set of loans.
+
+        Accepts ``status``, ``customer`` and ``ids`` filters in the request
+        body; at least one is required, or ``"all": true`` to re-evaluate
+        every loan. Matching loans are walked in id order, one UPDATE per
+        ``decide_batch_size`` loans, each batch in its own transaction.
+        """
+        filters = LoanDecisionFilterSerializer(data=request.data)
+        if not filters.is_valid():
+            return Response(filters.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = filters.validated_data
+
+        loans = self.filter_queryset(self.get_queryset())
+        if 'status' in data:
+            loans = loans.filter(status=data['status'])
+        if 'customer' in data:
+            loans = loans.filter(customer_id=data['customer'])
+        if 'ids' in data:
+            loans = loans.filter(id__in=data['ids'])
+
+        updated = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                # Lock the next batch and pin it, so the delta below is taken
+                # from exactly the rows the UPDATE changes.
+                batch_ids = list(
+                    loans.filter(pk__gt=last_id).order_by('pk').select_for_update()
+                    .values_list('pk', flat=True)[:self.decide_batch_size]
+                )
+                if not batch_ids:
+                    break
+                batch = Loan.objects.filter(pk__in=batch_ids)
+                customer_ids = list(batch.values_list('customer_id', flat=True).distinct())
+                # Rollup change as two grouped reads rather than one event per loan
+                delta = rollups.decision_delta(batch)
+                updated += batch.apply_decision()
+                outbox.record_event('loans.decided', payload={'customer_ids': customer_ids})
+                rollups.record_rollup_delta(delta)
+            last_id = batch_ids[-1]
+        return Response({"updated": updated}, status=status.HTTP_200_OK)
 
 @api_view(['POST'])
 def register_customer(request):
     serializer = CustomerRegisterSerializer(data=request.data)
     if serializer.is_valid():
-        customer = serializer.save()
+        with transaction.atomic():
+            customer = serializer.save()
+            outbox.record_customer_event('customer.created', customer)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+def register_customers_bulk(request):
+    rows = request.data.get('customers') if isinstance(request.data, dict) else request.data
+    if not isinstance(rows, list) or not rows:
+        return Response({"error": "Expected a non-empty list of customers"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(rows) > registration.MAX_BULK_CUSTOMERS:
+        return Response(
+            {"error": f"At most {registration.MAX_BULK_CUSTOMERS} customers per request"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        customers, errors = registration.bulk_register(rows)
+    except IntegrityError:
+        # A concurrent registration took an email or phone after the check
+        return Response({"error": "Email or phone already registered; retry to see which rows"},
+                        status=status.HTTP_409_CONFLICT)
+    if errors:
+        return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = CustomerRegisterSerializer(customers, many=True)
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
 
 
 
 @api_view(['POST'])
+@throttle_classes(SCORING_THROTTLES)
+@limit_concurrency
 def check_eligibility(request):
     serializer = LoanEligibilitySerializer(data=request.data)
     if serializer.is_valid():
@@ -63,7 +191,7 @@ def check_eligibility(request):
         except Customer.DoesNotExist:
             return Response({"error": "Customer not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        score = calculate_credit_score(customer)
+        score = cached_credit_score(customer)
         approval, corrected_interest = get_corrected_interest(score, interest_rate)
         monthly_installment = calculate_emi(amount, tenure, corrected_interest)
 
@@ -85,6 +213,40 @@ def check_eligibility(request):
 
 
 @api_view(['POST'])
+@throttle_classes(SCORING_THROTTLES)
+@limit_concurrency
+def pricing_grid(request):
+    serializer = PricingGridSerializer(data=request.data)
+    if serializer.is_valid():
+        # numpy is only needed here; keep it out of the views module import
+        from . import pricing
+
+        data = serializer.validated_data
+        customer_id = data['customer_id']
+
+        try:
+            customer = Customer.objects.get(id=customer_id)
+        except Customer.DoesNotExist:
+            return Response({"error": "Customer not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        score = cached_credit_score(customer)
+        amounts, tenures, rates = (
+            pricing.axis(data[name]['min'], data[name]['max'], data[name]['steps'], integer=(name == 'tenure'))
+            for name in ('loan_amount', 'tenure', 'interest_rate')
+        )
+
+        response = {"customer_id": customer_id, **pricing.pricing_grid(score, amounts, tenures, rates)}
+        return Response(response, status=status.HTTP_200_OK)
+
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+
+
+
+@api_view(['POST'])
+@throttle_classes(SCORING_THROTTLES)
+@limit_concurrency
 def create_loan(request):
     serializer = LoanCreateSerializer(data=request.data)
     if serializer.is_valid():
@@ -103,14 +265,16 @@ def create_loan(request):
         monthly_installment = calculate_emi(amount, tenure, corrected_interest)
 
         if approval:
-            loan = Loan.objects.create(
-                customer=customer,
-                amount=amount,
-                term_months=tenure,
-                interest_rate=corrected_interest,
-                monthly_installment=monthly_installment,
-                status='APPROVED'
-            )
+            with transaction.atomic():
+                loan = Loan.objects.create(
+                    customer=customer,
+                    amount=amount,
+                    term_months=tenure,
+                    interest_rate=corrected_interest,
+                    monthly_installment=monthly_installment,
+                    status='APPROVED'
+                )
+                outbox.record_loan_event('loan.created', loan)
             response = {
                 "loan_id": loan.id,
                 "customer_id": customer.id,
@@ -132,14 +296,24 @@ def create_loan(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def include_archived(request):
+    """Whether a read should also look in the archive (``?include_archived=true``)."""
+    return request.query_params.get('include_archived', '').lower() in ('1', 'true', 'yes')
+
+
 @api_view(['GET'])
 def view_loan(request, loan_id):
     try:
-        loan = Loan.objects.get(id=loan_id)
+        loan = Loan.objects.select_related('customer').get(id=loan_id)
+        serializer = LoanDetailSerializer(loan)
     except Loan.DoesNotExist:
-        return Response({"error": "Loan not found"}, status=status.HTTP_404_NOT_FOUND)
+        loan = None
+        if include_archived(request):
+            loan = ArchivedLoan.objects.select_related('customer').filter(id=loan_id).first()
+        if loan is None:
+            return Response({"error": "Loan not found"}, status=status.HTTP_404_NOT_FOUND)
+        serializer = ArchivedLoanDetailSerializer(loan)
 
-    serializer = LoanDetailSerializer(loan)
     return Response(serializer.data, status=status.HTTP_200_OK)
 @api_view(['GET'])
 def view_loans_by_customer(request, customer_id):
@@ -148,6 +322,45 @@ def view_loans_by_customer(request, customer_id):
     except Customer.DoesNotExist:
         return Response({"error": "Customer not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    loans = Loan.objects.filter(customer=customer)
-    serializer = LoanDetailSerializer(loans, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    loans = Loan.objects.filter(customer=customer).select_related('customer')
+    data = LoanDetailSerializer(loans, many=True).data
+    if include_archived(request):
+        archived = ArchivedLoan.objects.filter(customer=customer).select_related('customer')
+        data += ArchivedLoanDetailSerializer(archived, many=True).data
+    return Response(data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def portfolio_analytics(request):
+    """Loan counts and amounts from the LoanRollup table, never the Loan table.
+
+    Query params: ``month_from``/``month_to`` (YYYY-MM), ``status`` and
+    ``group_by`` (comma-separated month, status, tenure_band, amount_band).
+    """
+    serializer = PortfolioAnalyticsQuerySerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    params = serializer.validated_data
+
+    rollup = LoanRollup.objects.all()
+    if 'month_from' in params:
+        rollup = rollup.filter(month__gte=params['month_from'])
+    if 'month_to' in params:
+        rollup = rollup.filter(month__lte=params['month_to'])
+    if 'status' in params:
+        rollup = rollup.filter(status=params['status'])
+
+    group_by = params['group_by']
+    rows = (
+        rollup.values(*group_by)
+        .annotate(loan_count=Sum('loan_count'), amount_sum=Sum('amount_sum'))
+        .order_by(*group_by)
+    )
+    response = {"group_by": group_by, "rows": list(rows)}
+    return Response(response, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def db_pool_status(request):
+    """Connection pool metrics for this process (size, saturation, waits)."""
+    return Response(pool_stats(), status=status.HTTP_200_OK)